@@ -1,6 +1,709 @@
+import bz2
+import concurrent.futures
+import copy
+import gzip
+import hashlib
+import heapq
+import io
 import json
+import lzma
+import math
+import marshal
+import mmap
+import os
+import pickle
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from array import array
+from collections import deque
+from itertools import chain, groupby, islice, repeat
 from operator import itemgetter
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Openers for compressed files by file extension.
+COMPRESSED_OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+# Number of rows in one batch of columnar engine.
+COLUMN_BATCH_SIZE = 1 << 16
+# Default number of rows in one list of batch protocol (Node.run_batches).
+BATCH_SIZE = 1024
+
+# Number of the first input rows which are used by Graph.explain
+# to estimate selectivity of nodes.
+EXPLAIN_SAMPLE_SIZE = 100
+
+# Number of rows which are pickled together when rows are spilled to disk.
+SPILL_CHUNK_SIZE = 1024
+
+# Maximal number of sorted runs of external sort which are merged
+# (and kept open) at once.
+MERGE_FAN_IN = 64
+
+# Types of global values which are added to fingerprints of functions
+# by ResultCache.
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes,
+                   tuple, frozenset)
+
+# Number of bytes before saved offset of input file whose hash is checked
+# to find out that the file was only appended since incremental
+# computation (see Graph.run with state_file).
+INCREMENT_TAIL_SIZE = 4096
+
+
+def _tail_digest(path, offset):
+    """
+    :return: sha256 of INCREMENT_TAIL_SIZE bytes of file before offset
+    (None if file is shorter than offset).
+    """
+    with open(path, "rb") as file:
+        start = max(offset - INCREMENT_TAIL_SIZE, 0)
+        file.seek(start)
+        tail = file.read(offset - start)
+    if len(tail) < offset - start:
+        return None
+    return hashlib.sha256(tail).hexdigest()
+
+
+def _code_names(code):
+    """ :return: set of global names used by code and nested code. """
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if hasattr(constant, "co_names"):
+            names |= _code_names(constant)
+    return names
+
+
+def _update_digest(digest, value, update_file=None, seen=None):
+    """
+    Add value to digest (used for fingerprints of graphs and nodes).
+    :param update_file: function update_file(digest, path) which adds
+    fingerprint of input file of Graph object to digest (input files are
+    not added if it is None).
+    :param seen: set of ids of functions which are being added
+    (guard against recursive functions).
+    """
+    if isinstance(value, Graph):
+        digest.update(b"graph")
+        for node in value.nodes:
+            digest.update(type(node).__name__.encode())
+            _update_digest(digest, node._parameters(), update_file)
+            if update_file is not None and isinstance(node, Input) and \
+                    node.input is None and node.input_graph is None:
+                update_file(digest, node.input_file)
+
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key, update_file, seen)
+            _update_digest(digest, value[key], update_file, seen)
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _update_digest(digest, item, update_file, seen)
+
+    elif hasattr(value, "__code__"):
+        _update_function(digest, value, update_file, seen)
+
+    else:
+        digest.update(repr(value).encode())
+
+
+def _update_function(digest, function, update_file, seen):
+    """
+    Add function to digest: its code, defaults, values of closure
+    cells and values of globals which its code references. Only
+    functions and immutable values of globals are added: mutable
+    globals (lists, dicts, other objects) are usually state which
+    is changed by computing itself (counters, caches).
+    """
+    digest.update(function.__module__.encode()
+                  if function.__module__ else b"")
+    digest.update(function.__qualname__.encode())
+    digest.update(marshal.dumps(function.__code__))
+
+    seen = set() if seen is None else seen
+    if id(function) in seen:
+        return
+    seen.add(id(function))
+
+    _update_digest(digest, function.__defaults__, update_file, seen)
+    for cell in function.__closure__ or ():
+        try:
+            _update_digest(digest, cell.cell_contents, update_file, seen)
+        except ValueError:
+            # Cell is not filled yet.
+            digest.update(b"empty")
+
+    namespace = getattr(function, "__globals__", {})
+    for name in sorted(_code_names(function.__code__)):
+        value = namespace.get(name, _MISSING)
+        if isinstance(value, IMMUTABLE_TYPES) or \
+                hasattr(value, "__code__"):
+            digest.update(name.encode())
+            _update_digest(digest, value, update_file, seen)
+
+
+def _open_file(path, mode="rb", buffer_size=io.DEFAULT_BUFFER_SIZE):
+    """
+    Open file in binary mode. Files with .gz, .bz2 and .xz extensions
+    are (de)compressed on the fly.
+    :param path: path to file.
+    :param mode: "rb", "wb" or "ab".
+    :param buffer_size: size of buffer for reads and writes in bytes.
+    :return: buffered binary file object.
+    """
+    for extension, opener in COMPRESSED_OPENERS.items():
+        if path.endswith(extension):
+            file = opener(path, mode)
+            if "r" in mode:
+                return io.BufferedReader(file, buffer_size)
+            return io.BufferedWriter(file, buffer_size)
+
+    return open(path, mode, buffering=buffer_size)
+
+
+class _JsonLinesWriter(object):
+    """
+    Writes rows to file as JSON lines. Lines are collected in buffer and
+    written by one write call when buffer_size characters are collected.
+    """
+
+    def __init__(self, file, buffer_size):
+        """
+        :param file: text or binary file object.
+        :param buffer_size: size of buffer in characters.
+        """
+        self.file = file
+        self.binary = isinstance(file, (io.RawIOBase, io.BufferedIOBase))
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.size = 0
+
+    def write(self, row):
+        line = json.dumps(row) + "\n"
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        data = "".join(self.lines)
+        self.file.write(data.encode() if self.binary else data)
+        self.lines = []
+        self.size = 0
+
+
+def _write_rows(rows, output_file, buffer_size, shards=None, shard_by=None):
+    """
+    Stream rows to output_file, memory does not depend on number of rows.
+    :param rows: iterable of rows.
+    :param output_file: file object or path to file. Files with .gz, .bz2
+    and .xz extensions are compressed. If shards is not None then it is
+    a path with "{}" which is replaced by number of shard.
+    :param buffer_size: size of buffer of every output file in characters.
+    :param shards: number of output files. Row is written to shard by
+    crc32 of values of shard_by columns, so rows with equal keys are
+    always in one shard.
+    :param shard_by: string or list of columns.
+    """
+    if shards is None:
+        paths = [output_file] if isinstance(output_file, str) else []
+    elif shard_by is None or not isinstance(output_file, str) or \
+            "{}" not in output_file:
+        raise ValueError("Sharded output requires shard_by and path "
+                         "with {} placeholder\n")
+    else:
+        paths = [output_file.format(shard) for shard in range(shards)]
+
+    files = [_open_file(path, "wb", buffer_size) for path in paths]
+    try:
+        writers = [_JsonLinesWriter(file, buffer_size)
+                   for file in files or [output_file]]
+        if shards is None:
+            write = writers[0].write
+            for row in rows:
+                write(row)
+        else:
+            if isinstance(shard_by, str):
+                shard_by = [shard_by]
+            for row in rows:
+                key = json.dumps([row[column] for column in shard_by])
+                writers[zlib.crc32(key.encode()) % shards].write(row)
+
+        for writer in writers:
+            writer.flush()
+    finally:
+        for file in files:
+            file.close()
+
+
+class _Missing(object):
+    """ Value of column in column batch for rows without this column. """
+
+    def __repr__(self):
+        return "MISSING"
+
+
+_MISSING = _Missing()
+
+
+def _to_array(values):
+    """
+    Convert list of values to numpy array. Columns of ints, floats and
+    bools get numeric dtype, other columns are stored in object arrays.
+    """
+    if len(values) > 0:
+        value_type = type(values[0])
+        if value_type in (int, float, bool) and \
+                all(type(value) is value_type for value in values):
+            try:
+                return numpy.array(values, dtype=value_type)
+            except OverflowError:
+                pass
+
+    return numpy.fromiter(values, dtype=object, count=len(values))
+
+
+def _rows_to_columns(rows):
+    """
+    :param rows: list of rows.
+    :return: column batch, dict {column: numpy array with values}.
+    """
+    columns = {}
+    for row in rows:
+        for column in row:
+            columns[column] = None
+
+    return {column: _to_array([row.get(column, _MISSING) for row in rows])
+            for column in columns}
+
+
+def _columns_to_rows(batch):
+    """
+    :param batch: column batch.
+    :return: list of rows with python values.
+    """
+    columns = list(batch)
+    values = [batch[column].tolist() for column in columns]
+    rows = [dict(zip(columns, row_values)) for row_values in zip(*values)]
+
+    if any(batch[column].dtype == object and
+           any(value is _MISSING for value in column_values)
+           for column, column_values in zip(columns, values)):
+        rows = [{column: value for column, value in row.items()
+                 if value is not _MISSING} for row in rows]
+    return rows
+
+
+def _batch_length(batch):
+    """ :return: number of rows in column batch. """
+    for values in batch.values():
+        return len(values)
+    return 0
+
+
+def _concat_batches(batches):
+    """ Concatenate column batches with possibly different columns. """
+    if len(batches) == 1:
+        return batches[0]
+
+    columns = {}
+    for batch in batches:
+        for column in batch:
+            columns[column] = None
+
+    result = {}
+    for column in columns:
+        arrays = []
+        for batch in batches:
+            if column in batch:
+                arrays.append(batch[column])
+            else:
+                arrays.append(numpy.full(_batch_length(batch), _MISSING,
+                                         dtype=object))
+
+        if len(set(array.dtype for array in arrays)) > 1:
+            arrays = [array.astype(object) for array in arrays]
+        result[column] = numpy.concatenate(arrays)
+    return result
+
+
+def _take(batch, indices):
+    """ :return: column batch with rows by indices (or slice). """
+    return {column: values[indices] for column, values in batch.items()}
+
+
+def _gather(values, indices):
+    """
+    :return: array values[indices] where negative indices give None.
+    """
+    missing = indices < 0
+    if not numpy.any(missing):
+        return values[indices]
+
+    result = numpy.full(len(indices), None, dtype=object)
+    if len(values) > 0:
+        result[~missing] = values[indices[~missing]].astype(object)
+    return result
+
+
+def _tuple_getter(items):
+    """
+    Similar to operator.itemgetter but always returns tuple
+    (even for one item or for empty list of items).
+    """
+    if len(items) == 0:
+        return lambda value: ()
+    if len(items) == 1:
+        item = items[0]
+        return lambda value: (value[item],)
+    return itemgetter(*items)
+
+
+def _key_prefix(ordering, key):
+    """
+    :return: the longest prefix of ordering which consists of keys from key.
+    Output of nodes which process groups of rows with equal key in order
+    of input (and keep key columns) is sorted by this prefix.
+    """
+    prefix = []
+    for column in ordering:
+        if column not in key:
+            break
+        prefix.append(column)
+    return prefix
+
+
+def _describe(node):
+    """ :return: short description of node with its parameters. """
+    parameters = []
+    for key, value in node._parameters().items():
+        if value is None:
+            continue
+        if isinstance(value, Graph):
+            value = value.name or "graph {}".format(id(value))
+        elif hasattr(value, "__code__"):
+            value = value.__name__
+        elif isinstance(value, list) and len(value) > 0 and \
+                isinstance(value[0], dict):
+            value = "{} rows".format(len(value))
+        elif isinstance(value, (_FusedOperation, str)):
+            value = str(value)
+        else:
+            value = repr(value)
+        parameters.append("{}={}".format(key, value))
+
+    name = "" if node.name is None else " '{}'".format(node.name)
+    return "{}{}({})".format(type(node).__name__, name, ", ".join(parameters))
+
+
+def _scale(rows, factor):
+    """ :return: rows * factor or None if rows is unknown. """
+    return None if rows is None else int(round(rows * factor))
+
+
+def _groups(rows, sample, key):
+    """
+    Estimate number of groups with equal key from sample of rows with
+    Chao1 estimator: distinct + f1 * (f1 - 1) / (2 * (f2 + 1)), where f1
+    and f2 are numbers of keys which are seen once and twice.
+    :return: number of groups or rows if sample is unknown.
+    """
+    if rows is None or not sample or \
+            not all(column in sample[0] for column in key):
+        return rows
+
+    counts = {}
+    get_key = _tuple_getter(key)
+    for row in sample:
+        value = get_key(row)
+        counts[value] = counts.get(value, 0) + 1
+
+    once = sum(1 for count in counts.values() if count == 1)
+    if once == len(sample):
+        return rows
+    twice = sum(1 for count in counts.values() if count == 2)
+    return min(rows, int(len(counts) + once * (once - 1) / (2 * (twice + 1))))
+
+
+def _reduce_estimate(operation, key, rows, sample):
+    """
+    Estimate result of reduce operation from groups of sample.
+    :return: tuple (rows, cost, sample) (see Node._estimate).
+    """
+    groups = _groups(rows, sample, key)
+    if groups is None or not sample or \
+            not all(column in sample[0] for column in key):
+        return groups, rows, None
+
+    get_key = _tuple_getter(key)
+    blocks = {}
+    for row in sample:
+        blocks.setdefault(get_key(row), []).append(row)
+
+    result = [value for block in blocks.values()
+              for value in operation(block)]
+    return _scale(groups, len(result) / len(blocks)), rows, result
+
+
+def _tees(graph):
+    """ :return: set of Tee objects whose branches are read by graph. """
+    return set(node.input for node in graph.nodes
+               if isinstance(node, Branch))
+
+
+def _chunks(iterable, size):
+    """ Yield lists with at most size items from iterable. """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def _pool_map(function, arguments, workers, ordered=True):
+    """
+    Call function with every tuple from arguments in process pool and
+    yield results. At most 2 * workers calls are processed or wait to be
+    yielded at the same time.
+    :param function: picklable function.
+    :param arguments: iterable of tuples of arguments.
+    :param workers: number of worker processes.
+    :param ordered: if True then results are yielded in order of arguments,
+    otherwise as soon as they are computed.
+    """
+    max_pending = 2 * workers
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        pending = deque() if ordered else set()
+
+        for argument in arguments:
+            future = executor.submit(function, *argument)
+            if ordered:
+                pending.append(future)
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            else:
+                pending.add(future)
+                if len(pending) >= max_pending:
+                    done, pending = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+        if ordered:
+            for future in pending:
+                yield future.result()
+        else:
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+
+
+def _line_index(path):
+    """
+    :param path: path to uncompressed JSON-lines file.
+    :return: array with offsets of non-empty lines of file. Index is
+    kept in file path + ".idx" with size and modification time of file,
+    and it is rebuilt when file is changed.
+    """
+    stat = os.stat(path)
+    header = array("Q", [stat.st_size, stat.st_mtime_ns])
+    index_path = path + ".idx"
+
+    try:
+        stored = array("Q")
+        with open(index_path, "rb") as file:
+            stored.frombytes(file.read())
+        if stored[:2] == header:
+            return stored[2:]
+    except (OSError, ValueError):
+        pass
+
+    offsets = array("Q")
+    offset = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.isspace():
+                offsets.append(offset)
+            offset += len(line)
+
+    try:
+        with open(index_path, "wb") as file:
+            file.write((header + offsets).tobytes())
+    except OSError:
+        pass
+    return offsets
+
+
+def _byte_ranges(path, start, range_size):
+    """
+    Split file from start into ranges of about range_size bytes. Every
+    range ends after newline (or at the end of file).
+    :return: list of tuples (start, end).
+    """
+    size = os.path.getsize(path)
+    if start >= size:
+        return []
+
+    ranges = []
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        while start < size:
+            end = data.find(b"\n", min(start + range_size, size) - 1)
+            end = size if end < 0 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _decode_range(path, start, end):
+    """ Worker of parallel Input: decode rows from byte range of file. """
+    with open(path, "rb") as file:
+        file.seek(start)
+        lines = [line for line in file.read(end - start).split(b"\n")
+                 if line.strip()]
+
+    if len(lines) == 0:
+        return []
+    return json.loads(b"[" + b",".join(lines) + b"]")
+
+
+def _check_picklable(function, node):
+    """
+    Raise ValueError if function can not be sent to worker process.
+    :param function: user function of node.
+    :param node: Node object for error message.
+    """
+    try:
+        pickle.dumps(function)
+    except (pickle.PicklingError, AttributeError, TypeError) as error:
+        raise ValueError("Operation {!r} of {} can not be pickled for worker "
+                         "processes ({}). Use function defined at module "
+                         "level.".format(function, node, error)) from error
+
+
+def _map_chunk(operation, rows):
+    """ Apply map operation to chunk of rows in worker process. """
+    result = []
+    for row in rows:
+        result.extend(operation(row))
+    return result
+
+
+def _fold_chunk(function, start_state, rows):
+    """ Fold chunk of rows from start_state in worker process. """
+    state = start_state
+    for row in rows:
+        state = function(state, row)
+    return state
+
+
+def _reduce_partition(path, operation, key, by):
+    """
+    Sort and reduce one partition of rows in worker process.
+    :param path: path to file with pickled (index, row) pairs.
+    :param operation: reduce generator.
+    :param key: list of keys of reduce.
+    :param by: list of keys of sort or None if rows are already sorted.
+    :return: list of (order, outputs of reducer) for every block of rows,
+    where order is a sort key (or index) of the first row in the block.
+    """
+    rows = list(_read_spilled(open(path, "rb")))
+    if by is not None:
+        sort_key = itemgetter(*by)
+        rows.sort(key=lambda item: sort_key(item[1]))
+
+    get_key = itemgetter(*key)
+    result = []
+    for _, block in groupby(rows, key=lambda item: get_key(item[1])):
+        block = list(block)
+        if by is not None:
+            order = sort_key(block[0][1])
+        else:
+            order = block[0][0]
+        result.append((order, list(operation([row for _, row in block]))))
+    return result
+
+
+def _row_size(row):
+    """
+    Estimate memory in bytes which is taken by one row (dict object).
+    Keys are not counted because they are usually shared between rows.
+    """
+    return sys.getsizeof(row) + sum(sys.getsizeof(value)
+                                    for value in row.values())
+
+
+def _result_size(rows):
+    """
+    Estimate memory in bytes which is taken by result of graph.
+    Results which are not lists (e.g. stored on disk) take no memory.
+    """
+    if not isinstance(rows, list):
+        return 0
+    return sys.getsizeof(rows) + sum(_row_size(row) for row in rows)
+
+
+def _spill_rows(rows):
+    """
+    Write rows to anonymous temporary file.
+    :param rows: iterable of rows.
+    :return: file object opened for reading from the beginning.
+    """
+    file = tempfile.TemporaryFile()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == SPILL_CHUNK_SIZE:
+            pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+            chunk = []
+
+    if len(chunk) > 0:
+        pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+
+    file.seek(0)
+    return file
+
+
+def _read_spilled(file):
+    """
+    Yield rows from file which was written by _spill_rows
+    and close the file at the end.
+    """
+    with file:
+        while True:
+            try:
+                chunk = pickle.load(file)
+            except EOFError:
+                break
+            yield from chunk
+
+
+def _merge_runs(runs, key):
+    """
+    Merge sorted runs (files written by _spill_rows) into one run.
+    :return: file object of merged run.
+    """
+    return _spill_rows(heapq.merge(*[_read_spilled(run) for run in runs],
+                                   key=key))
+
 
 class Node(object):
     """ Class of Graph node objects. """
@@ -15,6 +718,10 @@ class Node(object):
         self.output = output
         self.name = name
 
+        # self.ordering is a list of keys by which output of this Node
+        # object is known to be sorted. It is computed by Graph object.
+        self.ordering = []
+
     def __call__(self, input=None):
         """
         Connect self Node objects with input Node object in keras-like style.
@@ -34,6 +741,55 @@ class Node(object):
         self.input = input
         return self
 
+    def _parameters(self):
+        """
+        :return: dict with parameters which define result of this Node
+        object (used for fingerprints of graphs).
+        """
+        return {}
+
+    def _output_ordering(self, input_ordering):
+        """
+        :param input_ordering: ordering of input Node object.
+        :return: list of keys by which output of this Node object is
+        sorted. Empty list means that order is unknown.
+        """
+        return []
+
+    def _estimate(self, rows, sample, estimates):
+        """
+        Estimate result of this Node object for Graph.explain.
+        :param rows: estimated number of input rows (None if unknown).
+        :param sample: list of first input rows or None if they are unknown.
+        :param estimates: dict {graph: estimated number of rows of result}.
+        :return: tuple (rows, cost, sample) for output of this Node object.
+        Cost is estimated number of operations with rows.
+        """
+        return rows, rows, None
+
+    def run_batches(self, batch_size):
+        """
+        Yield lists of rows of run(). This adapter lets batch engine use
+        nodes which implement only row protocol.
+        :param batch_size: maximal number of rows in one list.
+        """
+        yield from _chunks(self.run(), batch_size)
+
+    def run_columns(self):
+        """
+        Yield column batches from rows of run(). This adapter lets
+        columnar engine use nodes which implement only row protocol.
+        """
+        batch = []
+        for value in self.run():
+            batch.append(value)
+            if len(batch) == COLUMN_BATCH_SIZE:
+                yield _rows_to_columns(batch)
+                batch = []
+
+        if len(batch) > 0:
+            yield _rows_to_columns(batch)
+
     def __str__(self):
         if self.name is None:
             return "Node id = {}".format(id(self))
@@ -47,425 +803,2377 @@ class Input(Node):
     can be a list of dicts, another Graph object or path to file.
     """
 
-    def __init__(self, input=None, output=None, input_file=None, name=None):
+    def __init__(self, input=None, output=None, input_file=None, name=None,
+                 buffer_size=1 << 20, batch_size=None, sorted_by=None,
+                 workers=None, ordered=True, range_size=1 << 22,
+                 start_line=0, sample=None, seed=None):
         """
         :param input: list of dicts or Graph object
         :param output: Node object which is output.input == self
         :param input_file: path to file with data.
-        Using only when input is None.
+        Using only when input is None. Files with .gz, .bz2 and .xz
+        extensions are decompressed on the fly.
+
+        :param name: name of current Node object.
+        :param buffer_size: size of buffer for reading input_file in bytes.
+        :param batch_size: number of lines of input_file which are decoded
+        by one json.loads call. None means decoding line by line.
+        :param sorted_by: string or list of keys by which input is already
+        sorted. Sort nodes by these keys are skipped.
+
+        Next parameters work only with uncompressed input_file. Offsets of
+        lines are kept in index file input_file + ".idx" which is built on
+        first use and rebuilt when input_file is changed.
+
+        :param workers: number of worker processes. If it is not None then
+        input_file is split into ranges of lines of about range_size bytes
+        and ranges are decoded in workers.
+        :param ordered: if True then rows of ranges are yielded in order of
+        file, otherwise as soon as ranges are decoded.
+        :param range_size: size of range of input_file in bytes.
+        :param start_line: number of the first row which is read (number of
+        non-empty line), so reading can be resumed without scanning file.
+        :param sample: number of random rows which are read instead of
+        the whole file. Rows are yielded in order of file.
+        :param seed: seed of random generator for sample.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.input_file = input_file
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.ordered = ordered
+        self.range_size = range_size
+        self.start_line = start_line
+        self.sample = sample
+        self.seed = seed
+
+        # self.offset is a byte offset of input_file from which incremental
+        # computation reads new lines (see Graph.run with state_file), it
+        # is moved to the end of the last read line. None means that
+        # computation is not incremental.
+        self.offset = None
+
+        if isinstance(sorted_by, str):
+            self.sorted_by = [sorted_by]
+        else:
+            self.sorted_by = list(sorted_by or [])
+
+        if isinstance(input, Graph):
+            self.input_graph = input
+            self.input = None
+        else:
+            self.input_graph = None
+
+    def run(self):
+        """
+        Yield values from input source.
+
+        If Graph object is passed as input, values will be yielded from result
+        of input Graph which is already calculated (check topological sort).
+
+        If input is a list of dicts, values will be yielded from that list.
+
+        If input is None then input_file will be opened and values will be
+        yielded from input_file.
+
+        :return: yield value from input list, input file or input Graph object
+        """
+        if self.input_graph is None:
+            if self.input is None:
+                yield from self._read_file()
+            else:
+                for value in self.input:
+                    yield value
+        else:
+            for value in self.input_graph.res:
+                yield value
+
+    def run_batches(self, batch_size):
+        """ Yield lists of values from input source (see run). """
+        if self.input_graph is not None:
+            yield from _chunks(self.input_graph.res, batch_size)
+        elif self.input is not None:
+            yield from _chunks(self.input, batch_size)
+        else:
+            yield from self._read_batches(batch_size)
+
+    def _parameters(self):
+        return {"input": self.input, "input_file": self.input_file,
+                "input_graph": self.input_graph, "ordered": self.ordered,
+                "start_line": self.start_line, "sample": self.sample,
+                "seed": self.seed}
+
+    def _output_ordering(self, input_ordering):
+        if self.workers is not None and not self.ordered:
+            return []
+        if len(self.sorted_by) > 0:
+            return self.sorted_by
+        if self.input_graph is not None:
+            return self.input_graph.nodes[-1].ordering
+        return []
+
+    def _estimate(self, rows, sample, estimates):
+        if self.input_graph is not None:
+            res = self.input_graph.res
+            if res is not None:
+                sample = list(islice(iter(res), EXPLAIN_SAMPLE_SIZE))
+            sample = copy.deepcopy(sample)
+            rows = estimates.get(self.input_graph)
+        elif self.input is not None:
+            sample = copy.deepcopy(self.input[:EXPLAIN_SAMPLE_SIZE])
+            rows = len(self.input)
+        elif self.input_file is not None and \
+                os.path.exists(self.input_file):
+            with _open_file(self.input_file, "rb") as file:
+                lines = [line for line in islice(file, EXPLAIN_SAMPLE_SIZE)
+                         if not line.isspace()]
+            sample = [json.loads(line) for line in lines]
+            size = os.path.getsize(self.input_file)
+            rows = 0 if len(lines) == 0 else \
+                int(size * len(lines) / sum(len(line) for line in lines))
+        else:
+            return None, None, None
+        return rows, rows, sample
+
+    def _read_file(self):
+        """
+        Stream rows from JSON-lines input_file. File is never read
+        as a whole, so memory does not depend on size of file.
+        Empty lines are skipped.
+        """
+        if self.offset is not None:
+            yield from self._read_increment()
+            return
+
+        if self.sample is not None:
+            yield from self._read_sample()
+            return
+
+        if self.workers is not None:
+            for rows in self._parallel_read():
+                yield from rows
+            return
+
+        if self.batch_size is not None:
+            for batch in self._read_batches(self.batch_size):
+                yield from batch
+            return
+
+        with self._open_input() as file:
+            for line in file:
+                if not line.isspace():
+                    yield json.loads(line)
+
+    def _read_batches(self, batch_size):
+        """
+        Yield lists of rows of JSON-lines input_file. Every list is
+        decoded from batch_size lines by one json.loads call.
+        """
+        if self.sample is not None or self.workers is not None:
+            yield from _chunks(self._read_file(), batch_size)
+            return
+
+        with self._open_input() as file:
+            lines = (line for line in file if not line.isspace())
+            for batch in _chunks(lines, batch_size):
+                yield json.loads(b"[" + b",".join(batch) + b"]")
+
+    def _read_increment(self):
+        """
+        Yield rows of complete lines of input_file after self.offset and
+        move self.offset. Incomplete last line (which is being appended)
+        is left for the next computation.
+        """
+        with open(self._splittable_file(), "rb",
+                  buffering=self.buffer_size) as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                if not line.isspace():
+                    yield json.loads(line)
+
+    def _open_input(self):
+        """ Open input_file at the beginning of line self.start_line. """
+        file = _open_file(self.input_file, "rb", self.buffer_size)
+        if self.start_line > 0:
+            file.seek(self._start_offset())
+        return file
+
+    def _start_offset(self):
+        """ :return: offset of line self.start_line in input_file. """
+        if self.start_line == 0:
+            return 0
+
+        offsets = _line_index(self._splittable_file())
+        if self.start_line < len(offsets):
+            return offsets[self.start_line]
+        return os.path.getsize(self.input_file)
+
+    def _splittable_file(self):
+        """ :return: input_file if it can be split by offsets of lines. """
+        if self.input_file.endswith(tuple(COMPRESSED_OPENERS)):
+            raise ValueError("Compressed file {} can not be split by "
+                             "lines\n".format(self.input_file))
+        return self.input_file
+
+    def _parallel_read(self):
+        """
+        Decode newline-aligned byte ranges of input_file in process pool.
+        :return: yield lists of rows of ranges.
+        """
+        path = self._splittable_file()
+        ranges = _byte_ranges(path, self._start_offset(), self.range_size)
+        yield from _pool_map(_decode_range,
+                             ((path, start, end) for start, end in ranges),
+                             self.workers, self.ordered)
+
+    def _read_sample(self):
+        """
+        Yield self.sample random rows of input_file. Lines are found by
+        index of offsets, so only sampled lines are read and decoded.
+        """
+        path = self._splittable_file()
+        offsets = _line_index(path)
+        first = min(self.start_line, len(offsets))
+        count = min(self.sample, len(offsets) - first)
+        lines = random.Random(self.seed).sample(range(first, len(offsets)),
+                                                count)
+        if count == 0:
+            return
+
+        with open(path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in sorted(lines):
+                start = offsets[line]
+                end = data.find(b"\n", start)
+                yield json.loads(data[start:end if end >= 0 else len(data)])
+
+
+class Map(Node):
+    """ Node class which provides Map operation. """
+
+    def __init__(self, operation, input=None, output=None, name=None,
+                 workers=None, chunk_size=1000, ordered=True):
+        """
+        :param operation: map generator to apply for input values.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        :param workers: number of worker processes. None means that
+        operation is applied in the current process. Operation should be
+        picklable (defined at module level) to be used in workers.
+
+        :param chunk_size: number of input rows sent to worker at once.
+        :param ordered: if True then results are yielded in order of input
+        rows, otherwise chunks are yielded as soon as they are computed.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.operation = operation
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+
+    def run(self):
+        """
+        Apply map operation to each value from output of input Node object and
+        then yield it forward to Graph computations.
+        """
+        if self.workers is not None:
+            yield from self._parallel_run()
+            return
+
+        for value in self.input.run():
+            yield from self.operation(value)
+
+    def _parameters(self):
+        return {"operation": self.operation, "ordered": self.ordered}
+
+    def _estimate(self, rows, sample, estimates):
+        if not sample:
+            return rows, rows, None
+        result = [value for row in sample for value in self.operation(row)]
+        return _scale(rows, len(result) / len(sample)), rows, result
+
+    def _parallel_run(self):
+        """
+        Send chunks of input rows to process pool. At most 2 * workers
+        chunks are processed or wait to be yielded at the same time.
+        """
+        _check_picklable(self.operation, self)
+
+        chunks = _chunks(self.input.run(), self.chunk_size)
+        for result in _pool_map(_map_chunk,
+                                ((self.operation, chunk) for chunk in chunks),
+                                self.workers, self.ordered):
+            yield from result
+
+    def run_batches(self, batch_size):
+        """ Apply map operation to every row of batches of input Node. """
+        if self.workers is not None:
+            yield from super().run_batches(batch_size)
+            return
+
+        operation = self.operation
+        for batch in self.input.run_batches(batch_size):
+            result = []
+            for value in batch:
+                result.extend(operation(value))
+
+            if len(result) > 0:
+                yield result
+
+    def run_columns(self):
+        """
+        Apply row map operation to rows of every column batch
+        of input Node object.
+        """
+        if self.workers is not None:
+            yield from super().run_columns()
+            return
+
+        for batch in self.input.run_columns():
+            result = []
+            for value in _columns_to_rows(batch):
+                result.extend(self.operation(value))
+
+            if len(result) > 0:
+                yield _rows_to_columns(result)
+
+
+class Filter(Node):
+    """ Node class which yields only rows satisfying a predicate. """
+
+    def __init__(self, predicate, columns=None, input=None, output=None,
+                 name=None):
+        """
+        :param predicate: function which takes row and returns True
+        if row should be yielded.
+        :param columns: list of columns which are used by predicate.
+        If it is declared then the optimizer of Graph can move Filter
+        below Join on these columns.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.predicate = predicate
+        if isinstance(columns, str):
+            self.columns = [columns]
+        else:
+            self.columns = None if columns is None else list(columns)
+
+    def _parameters(self):
+        return {"predicate": self.predicate}
+
+    def _output_ordering(self, input_ordering):
+        return input_ordering
+
+    def _estimate(self, rows, sample, estimates):
+        if not sample:
+            return _scale(rows, 0.5), rows, None
+        result = [value for value in sample if self.predicate(value)]
+        return _scale(rows, len(result) / len(sample)), rows, result
+
+    def run(self):
+        """ Yield rows of input Node object which satisfy predicate. """
+        predicate = self.predicate
+        for value in self.input.run():
+            if predicate(value):
+                yield value
+
+    def run_batches(self, batch_size):
+        """ Yield rows of batches of input Node which satisfy predicate. """
+        predicate = self.predicate
+        for batch in self.input.run_batches(batch_size):
+            result = [value for value in batch if predicate(value)]
+            if len(result) > 0:
+                yield result
+
+
+class Project(Node):
+    """ Node class which keeps only given columns of rows. """
+
+    def __init__(self, columns, input=None, output=None, name=None):
+        """
+        :param columns: string or list of columns to keep.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        """
+        super().__init__(input=input, output=output, name=name)
+        if isinstance(columns, str):
+            self.columns = [columns]
+        else:
+            self.columns = list(columns)
+
+    def _parameters(self):
+        return {"columns": self.columns}
+
+    def _output_ordering(self, input_ordering):
+        return _key_prefix(input_ordering, self.columns)
+
+    def _estimate(self, rows, sample, estimates):
+        if sample is not None:
+            sample = [{column: value[column] for column in self.columns}
+                      for value in sample]
+        return rows, rows, sample
+
+    def run(self):
+        """ Yield rows of input Node object with columns from self.columns. """
+        columns = self.columns
+        for value in self.input.run():
+            yield {column: value[column] for column in columns}
+
+    def run_batches(self, batch_size):
+        """ Keep columns from self.columns in batches of input Node. """
+        columns = self.columns
+        for batch in self.input.run_batches(batch_size):
+            yield [{column: value[column] for column in columns}
+                   for value in batch]
+
+
+class Tee(Node):
+    """
+    Node class which lets several chains of nodes read its input in one
+    pass. Every chain starts from its own Branch node (see branch()).
+    """
+
+    def __init__(self, input=None, output=None, name=None, buffer_size=10000):
+        """
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        :param buffer_size: maximal number of rows which are kept in memory
+        for branches which are behind other branches. Newer rows are
+        spilled to temporary file and read back by slow branches.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.buffer_size = buffer_size
+        self.branches = []
+        self._lock = threading.Lock()
+        self._spill_file = None
+        self._reset()
+
+    def branch(self, name=None):
+        """ :return: new Branch object which yields rows of this Tee. """
+        branch = Branch(self, name=name)
+        self.branches.append(branch)
+        return branch
+
+    def _output_ordering(self, input_ordering):
+        return input_ordering
+
+    def _estimate(self, rows, sample, estimates):
+        return rows, rows, sample
+
+    def run(self):
+        """ Yield values of input Node object (Tee without branches). """
+        yield from self.input.run()
+
+    def _reset(self):
+        """ Forget the current pass over input Node object. """
+        if self._spill_file is not None:
+            self._spill_file.close()
+
+        self._source = None
+        self._exhausted = False
+        # self._chunks is a dict {index: [rows, offset, readers]}. rows is
+        # None if chunk is spilled to self._spill_file at offset. Chunk
+        # is dropped when all branches have read it.
+        self._chunks = {}
+        self._pulled = 0
+        self._memory_rows = 0
+        self._spill_file = None
+        self._started = set()
+        self._finished = set()
+
+    def _read(self, branch):
+        """
+        Yield rows of the current pass for branch. The first branch which
+        starts reading starts the pass. If branch starts reading again
+        then a new pass is started.
+        """
+        with self._lock:
+            if branch in self._started:
+                self._reset()
+            self._started.add(branch)
+            if self._source is None:
+                self._source = self.input.run()
+
+        index = 0
+        while True:
+            with self._lock:
+                rows = self._chunk(index)
+            if rows is None:
+                break
+            yield from rows
+            index += 1
+
+        with self._lock:
+            self._finished.add(branch)
+            if len(self._finished) == len(self.branches):
+                self._reset()
+
+    def _chunk(self, index):
+        """
+        :return: rows of chunk with index (pulled from input if it is not
+        pulled yet) or None if input is exhausted.
+        """
+        if index == self._pulled:
+            rows = None if self._exhausted else \
+                list(islice(self._source, SPILL_CHUNK_SIZE))
+            if not rows:
+                self._exhausted = True
+                return None
+
+            self._pulled += 1
+            entry = [rows, None, 0]
+            if self._memory_rows + len(rows) > self.buffer_size:
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile()
+                self._spill_file.seek(0, io.SEEK_END)
+                entry = [None, self._spill_file.tell(), 0]
+                pickle.dump(rows, self._spill_file, pickle.HIGHEST_PROTOCOL)
+            else:
+                self._memory_rows += len(rows)
+            self._chunks[index] = entry
+
+        entry = self._chunks[index]
+        rows = entry[0]
+        if rows is None:
+            self._spill_file.seek(entry[1])
+            rows = pickle.load(self._spill_file)
+
+        entry[2] += 1
+        if entry[2] == len(self.branches):
+            del self._chunks[index]
+            if entry[0] is not None:
+                self._memory_rows -= len(rows)
+        return rows
+
+
+class Branch(Node):
+    """ Node class which yields rows of Tee object (see Tee.branch). """
+
+    def __init__(self, tee, output=None, name=None):
+        """
+        :param tee: Tee object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        """
+        super().__init__(input=tee, output=output, name=name)
+
+    def _output_ordering(self, input_ordering):
+        return input_ordering
+
+    def _estimate(self, rows, sample, estimates):
+        return rows, 0, sample
+
+    def run(self):
+        """ Yield rows of the current pass of Tee object. """
+        yield from self.input._read(self)
+
+
+class _FusedOperation(object):
+    """ Map operation which applies several map operations one by one. """
+
+    def __init__(self, operations):
+        """ :param operations: list of map generators. """
+        self.operations = operations
+
+    def __call__(self, value):
+        values = [value]
+        for operation in self.operations:
+            values = [result for value in values
+                      for result in operation(value)]
+        yield from values
+
+    def __repr__(self):
+        return " + ".join(getattr(operation, "__name__", repr(operation))
+                          for operation in self.operations)
+
+
+class Sort(Node):
+    """ Node class which provides Sort operation. """
+
+    def __init__(self, by, input=None, output=None, name=None,
+                 memory_limit=None):
+        """
+        :param by: string or list of keys.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node.
+        :param memory_limit: approximate number of bytes of rows which
+        can be kept in memory. If it is exceeded then sorted runs are
+        written to temporary files and merged at the end (external sort).
+        None means that all rows are sorted in memory.
+        """
+        super().__init__(input=input, output=output, name=name)
+        if isinstance(by, str):
+            self.by = [by]
+        elif isinstance(by, list):
+            self.by = by
+        else:
+            raise ValueError("Unknown type for _by_ value\n")
+
+        self.memory_limit = memory_limit
+
+        # self.elided is True if input is already sorted by self.by
+        # (it is found by Graph object), then values are passed as is.
+        self.elided = False
+
+    def run(self):
+        """
+        Sort a result of input Node object work.
+        :return: yield sorted values from previous node
+        """
+        if self.elided:
+            yield from self.input.run()
+        elif self.memory_limit is None:
+            result = list(self.input.run())
+            result.sort(key=itemgetter(*self.by))
+            yield from result
+        else:
+            yield from self._external_run(self.input.run())
+
+    def run_batches(self, batch_size):
+        """ Sort rows of batches of input Node and yield them by batches. """
+        if self.elided:
+            yield from self.input.run_batches(batch_size)
+        elif self.memory_limit is None:
+            result = []
+            for batch in self.input.run_batches(batch_size):
+                result.extend(batch)
+            result.sort(key=itemgetter(*self.by))
+            for start in range(0, len(result), batch_size):
+                yield result[start:start + batch_size]
+        else:
+            rows = chain.from_iterable(self.input.run_batches(batch_size))
+            yield from _chunks(self._external_run(rows), batch_size)
+
+    def _parameters(self):
+        return {"by": self.by}
+
+    def _output_ordering(self, input_ordering):
+        self.elided = input_ordering[:len(self.by)] == self.by
+        if self.elided:
+            return input_ordering
+        return self.by
+
+    def _estimate(self, rows, sample, estimates):
+        if rows is None or self.elided:
+            return rows, rows, sample
+        return rows, int(rows * math.log2(max(rows, 2))), sample
+
+    def _external_run(self, rows):
+        """
+        External merge sort of rows.
+
+        1. Collect rows until memory_limit is exceeded.
+        2. Sort collected rows and spill them to temporary file (sorted run).
+        3. Merge all sorted runs with heap.
+
+        At most MERGE_FAN_IN runs are merged at once. levels[i] is a list
+        of runs which were merged i times, when it has MERGE_FAN_IN runs
+        they are merged into one run of the next level. So the number of
+        open files grows with logarithm of number of runs and every row
+        is rewritten only once per level.
+
+        Only consecutive runs are merged, in order of creation, and
+        heapq.merge is stable, so the order of rows with equal keys is
+        the same as in run.
+        """
+        key = itemgetter(*self.by)
+        levels = [[]]
+        buffer = []
+        buffer_size = 0
+
+        for value in rows:
+            buffer.append(value)
+            buffer_size += _row_size(value)
+            if buffer_size > self.memory_limit:
+                buffer.sort(key=key)
+                self._add_run(levels, _spill_rows(buffer), key)
+                buffer = []
+                buffer_size = 0
+
+        buffer.sort(key=key)
+        if len(levels) == 1 and len(levels[0]) == 0:
+            yield from buffer
+            return
+
+        if len(buffer) > 0:
+            self._add_run(levels, _spill_rows(buffer), key)
+            buffer = []
+
+        # Runs of higher levels are older.
+        runs = [run for level in reversed(levels) for run in level]
+        while len(runs) > MERGE_FAN_IN:
+            runs = [_merge_runs(runs[:MERGE_FAN_IN], key)] + \
+                runs[MERGE_FAN_IN:]
+        yield from heapq.merge(*[_read_spilled(run) for run in runs], key=key)
+
+    @staticmethod
+    def _add_run(levels, run, key):
+        """ Add new sorted run to levels of external sort (see above). """
+        levels[0].append(run)
+        level = 0
+        while len(levels[level]) == MERGE_FAN_IN:
+            if level + 1 == len(levels):
+                levels.append([])
+            levels[level + 1].append(_merge_runs(levels[level], key))
+            levels[level] = []
+            level += 1
+
+    def run_columns(self):
+        """
+        Sort all column batches of input Node object with stable
+        numpy sort (memory_limit is not used by columnar engine).
+        :return: yield one sorted column batch.
+        """
+        batches = list(self.input.run_columns())
+        if len(batches) == 0:
+            return
+
+        batch = _concat_batches(batches)
+        order = numpy.arange(_batch_length(batch))
+        for column in reversed(self.by):
+            order = order[numpy.argsort(batch[column][order], kind="stable")]
+
+        yield _take(batch, order)
+
+
+class Join(Node):
+    """ Node class which provides Join operation. """
+
+    def __init__(self, on, key, strategy, input=None, output=None, name=None,
+                 method="sort"):
+        """
+        :param on: Graph object which is joined.
+        Graph object is always LEFT for joining operation.
+
+        :param key: string or list of string. Keys for join operation
+        :param strategy: string. SQL strategy of join. Supports inner, outer,
+        left and right strategies.
+
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node.
+        :param method: string. Algorithm of join. Supports sort, hash and
+        merge methods. Sort join yields rows sorted by key. Hash join builds
+        hash table on the smaller table and streams the larger one, its
+        result is not sorted by key. Merge join expects that both tables
+        are already sorted by key and walks them in lockstep.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.graph = on
+        self.strategy = strategy
+
+        if method not in ("sort", "hash", "merge"):
+            raise ValueError("Unknown join method {}\n".format(method))
+        self.method = method
+
+        if isinstance(key, str):
+            self.key = [key]
+        else:
+            if len(key) > 0:
+                self.key = key
+            else:
+                self.key = []
+                if self.strategy == "outer":
+                    self.strategy = "cross"
+
+    def run(self):
+        """
+        Join two lists of dicts and then yield values
+        from the result of joining.
+
+        Distribute work of joining to different methods of joining.
+        Sort join sorts both tables by key and merges them, it works with
+        N log N asymptotics.
+
+        If dicts in left table and right table have common names of columns
+        then add "left_" and "right_" prefix to these names in result columns
+        (if common columns are not in self.key).
+
+        Rows of joined tables are never modified, so results of other
+        Graph objects can be safely reused. Schema of the result is
+        computed once from the first rows of both tables.
+        """
+        yield from self._join(self.input.run())
+
+    def run_batches(self, batch_size):
+        """ Join rows of batches of input Node, yield joined batches. """
+        right = chain.from_iterable(self.input.run_batches(batch_size))
+        yield from _chunks(self._join(right), batch_size)
+
+    def _join(self, right):
+        """
+        :param right: iterable with rows of input Node.
+        :return: yield joined rows (see run).
+        """
+
+        # left is a result of input Graph object. This value could not
+        # be calculated on initialization step.
+        # right is a result of input Node work.
+        left = iter(self.graph.res)
+
+        first_left = next(left, None)
+        if first_left is not None:
+            left = chain([first_left], left)
+
+        if self.method == "hash" and self.strategy != "cross":
+            yield from self._hash_run(left, right, first_left)
+            return
+
+        right = iter(right)
+        first_right = next(right, None)
+        if first_right is not None:
+            right = chain([first_right], right)
+        self._create_schema(first_left, first_right)
+
+        if self.strategy == "cross":
+            yield from self._cross_run(left, list(right))
+
+        elif self.method == "merge":
+            yield from self._merge_rows(left, right)
+
+        else:
+            left = sorted(left, key=itemgetter(*self.key))
+            right = sorted(right, key=itemgetter(*self.key))
+            yield from self._merge_rows(left, right)
+
+    def _parameters(self):
+        return {"graph": self.graph, "key": self.key,
+                "strategy": self.strategy, "method": self.method}
+
+    def _output_ordering(self, input_ordering):
+        if self.method == "hash" or self.strategy == "cross":
+            return []
+        return list(self.key)
+
+    def _estimate(self, rows, sample, estimates):
+        left = estimates.get(self.graph)
+        if rows is None or left is None:
+            return None, None, None
+
+        # Every row of the larger table is expected to match one row
+        # of the smaller table (join by foreign key).
+        if self.strategy == "cross":
+            result = left * rows
+        else:
+            result = max(left, rows)
+
+        if self.method == "sort" and self.strategy != "cross":
+            cost = int(left * math.log2(max(left, 2)) +
+                       rows * math.log2(max(rows, 2)))
+        else:
+            cost = left + rows
+        return result, cost + result, None
+
+    def _create_schema(self, first_left, first_right):
+        """
+        Compute columns of joined table and getters which build
+        joined rows with precomputed order of columns.
+        :param first_left: first row of LEFT table or None if it is empty.
+        :param first_right: first row of RIGHT table or None if it is empty.
+        """
+        left_columns = list(first_left.keys()) if first_left else []
+        right_columns = list(first_right.keys()) if first_right else []
+        common_columns = (set(left_columns) & set(right_columns)) - \
+            set(self.key)
+
+        # Every column of joined table is described by its position in
+        # tuple (values of left columns) + (values of right columns).
+        positions = {}
+        for position, column in enumerate(left_columns):
+            if column in common_columns:
+                column = "left_" + column
+            positions[column] = position
+
+        right_key_positions = {}
+        for position, column in enumerate(right_columns, len(left_columns)):
+            if column in common_columns:
+                column = "right_" + column
+            if column in positions:
+                right_key_positions[column] = position
+            else:
+                positions[column] = position
+
+        self.columns = sorted(positions)
+        self._common_columns = common_columns
+        self._left_columns = left_columns
+        self._right_columns = right_columns
+        self._left_getter = _tuple_getter(left_columns)
+        self._right_getter = _tuple_getter(right_columns)
+        self._left_nulls = (None,) * len(left_columns)
+        self._right_nulls = (None,) * len(right_columns)
+
+        # Key columns are taken from the right table only when
+        # there is no row from the left table.
+        self._order = _tuple_getter([positions[column]
+                                     for column in self.columns])
+        self._right_only_order = _tuple_getter([
+            right_key_positions.get(column, positions[column])
+            for column in self.columns
+        ])
+
+    def _join_rows(self, left, right):
+        """
+        :param left: row of LEFT table or None.
+        :param right: row of RIGHT table or None.
+        :return: new row of joined table.
+        """
+        # Rows with other columns than the first rows are joined by
+        # slow path (missing columns raise KeyError in getters).
+        if (left is not None and len(left) != len(self._left_columns)) or \
+                (right is not None and
+                 len(right) != len(self._right_columns)):
+            return self._join_sparse_rows(left, right)
+
+        try:
+            if left is None:
+                values = self._left_nulls + self._right_getter(right)
+                return dict(zip(self.columns,
+                                self._right_only_order(values)))
+
+            if right is None:
+                values = self._left_getter(left) + self._right_nulls
+            else:
+                values = self._left_getter(left) + self._right_getter(right)
+            return dict(zip(self.columns, self._order(values)))
+        except KeyError:
+            return self._join_sparse_rows(left, right)
+
+    def _join_sparse_rows(self, left, right):
+        """
+        Slow path of _join_rows for rows whose columns differ from
+        columns of the first rows. Missing columns are absent in joined
+        row, extra columns are added (with prefix if both rows have them).
+        """
+        common_columns = self._common_columns
+        if left is not None and right is not None:
+            common_columns = common_columns | (
+                (left.keys() & right.keys()) - set(self.key))
+
+        value = {}
+        for prefix, row, columns in (("left_", left, self._left_columns),
+                                     ("right_", right, self._right_columns)):
+            if row is None:
+                # Columns of absent row are None, key is taken from
+                # the other row.
+                row = dict.fromkeys(column for column in columns
+                                    if column not in self.key)
+            for column, item in row.items():
+                if column in common_columns:
+                    column = prefix + column
+                elif column in value:
+                    continue
+                value[column] = item
+        return {column: value[column] for column in sorted(value)}
+
+    def _hash_run(self, left, right, first_left):
+        """
+        1. Read rows of input Node object until it is known which table
+        is smaller (at most len(self.graph.res) + 1 rows are read).
+        2. Build hash table {key: rows} on the smaller table.
+        3. Stream the larger table and probe hash table with every row.
+        4. Yield unmatched rows of hash table for outer strategies.
+        :return: yield values from joined table.
+        """
+        buffer = list(islice(right, len(self.graph.res) + 1))
+        self._create_schema(first_left, buffer[0] if buffer else None)
+
+        if len(buffer) <= len(self.graph.res):
+            table = self._build_table(buffer)
+            yield from self._hash_probe(left, table, probe_is_left=True)
+        else:
+            table = self._build_table(left)
+            yield from self._hash_probe(chain(buffer, right), table,
+                                        probe_is_left=False)
+
+    def _build_table(self, rows):
+        """ :return: dict {key: list of rows with this key}. """
+        get_key = itemgetter(*self.key)
+        table = {}
+        for row in rows:
+            table.setdefault(get_key(row), []).append(row)
+        return table
+
+    def _hash_probe(self, rows, table, probe_is_left):
+        """
+        :param rows: iterable of rows of probe table.
+        :param table: hash table built on the other table.
+        :param probe_is_left: True if rows are from LEFT table.
+        :return: yield values from joined table.
+        """
+        if probe_is_left:
+            keep_probe = self.strategy in ("left", "outer")
+            keep_build = self.strategy in ("right", "outer")
+        else:
+            keep_probe = self.strategy in ("right", "outer")
+            keep_build = self.strategy in ("left", "outer")
+
+        get_key = itemgetter(*self.key)
+        matched = set()
+
+        for row in rows:
+            key = get_key(row)
+            group = table.get(key)
+            if group is None:
+                if keep_probe:
+                    if probe_is_left:
+                        yield self._join_rows(row, None)
+                    else:
+                        yield self._join_rows(None, row)
+                continue
+
+            if keep_build:
+                matched.add(key)
+
+            for other in group:
+                if probe_is_left:
+                    yield self._join_rows(row, other)
+                else:
+                    yield self._join_rows(other, row)
+
+        if keep_build:
+            for key, group in table.items():
+                if key not in matched:
+                    for row in group:
+                        if probe_is_left:
+                            yield self._join_rows(None, row)
+                        else:
+                            yield self._join_rows(row, None)
+
+    def _merge_rows(self, left, right):
+        """
+        Join tables which are already sorted by key. Both tables are
+        consumed lazily and only rows with the current key are kept
+        in memory, so it works with O(N + M) time and O(group) memory.
+        :param left: iterable of rows of LEFT table.
+        :param right: iterable of rows of RIGHT table.
+        :return: yield values from joined table sorted by key.
+        """
+        keep_left = self.strategy in ("left", "outer")
+        keep_right = self.strategy in ("right", "outer")
+
+        left_groups = self._sorted_groups(left)
+        right_groups = self._sorted_groups(right)
+        left_group = next(left_groups, None)
+        right_group = next(right_groups, None)
+
+        while left_group is not None and right_group is not None:
+            left_key, left_rows = left_group
+            right_key, right_rows = right_group
+
+            if left_key < right_key:
+                if keep_left:
+                    for row in left_rows:
+                        yield self._join_rows(row, None)
+                left_group = next(left_groups, None)
+
+            elif right_key < left_key:
+                if keep_right:
+                    for row in right_rows:
+                        yield self._join_rows(None, row)
+                right_group = next(right_groups, None)
+
+            else:
+                for left_row in left_rows:
+                    for right_row in right_rows:
+                        yield self._join_rows(left_row, right_row)
+                left_group = next(left_groups, None)
+                right_group = next(right_groups, None)
+
+        while keep_left and left_group is not None:
+            for row in left_group[1]:
+                yield self._join_rows(row, None)
+            left_group = next(left_groups, None)
+
+        while keep_right and right_group is not None:
+            for row in right_group[1]:
+                yield self._join_rows(None, row)
+            right_group = next(right_groups, None)
+
+    def _sorted_groups(self, rows):
+        """
+        Split sorted rows into groups with equal keys.
+        :return: yield tuples (key, list of rows with this key).
+        """
+        get_key = itemgetter(*self.key)
+        previous_key = None
+        for key, group in groupby(rows, key=get_key):
+            if previous_key is not None and key < previous_key:
+                raise RuntimeError("Input of merge join in {} is not sorted "
+                                   "by {}".format(self, self.key))
+            previous_key = key
+            yield key, list(group)
+
+    def _cross_run(self, left, right):
+        """
+        Run when strategy == 'outer' and key is None.
+        :return: yield value from CROSS joined table.
+        """
+        for first_dict in left:
+            for second_dict in right:
+                yield self._join_rows(first_dict, second_dict)
+
+    def run_columns(self):
+        """
+        Vectorized sort join for columnar engine.
+
+        1. Encode keys of both tables with numpy.unique, so codes are
+        ordered like keys.
+        2. Find ranges of rows with equal codes in both sorted tables.
+        3. Compute indices of left and right rows for every row of joined
+        table (-1 means that there is no row) and gather columns by them.
+
+        Hash and cross joins use row protocol through adapter.
+        :return: yield one column batch with joined table sorted by key.
+        """
+        if self.method == "hash" or self.strategy == "cross":
+            yield from super().run_columns()
+            return
+
+        left = _rows_to_columns(list(self.graph.res))
+        batches = list(self.input.run_columns())
+        right = _concat_batches(batches) if batches else {}
+        left_length = _batch_length(left)
+        right_length = _batch_length(right)
+
+        codes = numpy.zeros(left_length + right_length, dtype=numpy.int64)
+        for column in self.key:
+            values = numpy.concatenate([
+                left.get(column, numpy.empty(0, dtype=object)),
+                right.get(column, numpy.empty(0, dtype=object)),
+            ])
+            unique, inverse = numpy.unique(values, return_inverse=True)
+            codes = codes * len(unique) + inverse.reshape(-1)
+
+        left_codes = codes[:left_length]
+        right_codes = codes[left_length:]
+        left_order = numpy.argsort(left_codes, kind="stable")
+        right_order = numpy.argsort(right_codes, kind="stable")
+        left_codes = left_codes[left_order]
+        right_codes = right_codes[right_order]
+
+        if self.method == "merge" and (
+                numpy.any(left_order != numpy.arange(left_length)) or
+                numpy.any(right_order != numpy.arange(right_length))):
+            raise RuntimeError("Input of merge join in {} is not sorted "
+                               "by {}".format(self, self.key))
+
+        groups = numpy.union1d(left_codes, right_codes)
+        left_start = numpy.searchsorted(left_codes, groups, "left")
+        left_count = numpy.searchsorted(left_codes, groups, "right") - \
+            left_start
+        right_start = numpy.searchsorted(right_codes, groups, "left")
+        right_count = numpy.searchsorted(right_codes, groups, "right") - \
+            right_start
+
+        # Groups without rows from one table give one row per row of
+        # the other table if strategy keeps unmatched rows.
+        keep_left = self.strategy in ("left", "outer")
+        keep_right = self.strategy in ("right", "outer")
+        left_size = numpy.where(left_count == 0, int(keep_right), left_count)
+        right_size = numpy.where(right_count == 0, int(keep_left),
+                                 right_count)
+        sizes = left_size * right_size
+
+        group = numpy.repeat(numpy.arange(len(groups)), sizes)
+        offset = numpy.arange(len(group)) - \
+            numpy.repeat(numpy.cumsum(sizes) - sizes, sizes)
+        left_position = left_start[group] + offset // right_size[group]
+        right_position = right_start[group] + offset % right_size[group]
+
+        left_index = numpy.where(
+            left_count[group] == 0, -1,
+            left_order[numpy.minimum(left_position, max(left_length - 1, 0))]
+            if left_length > 0 else -1)
+        right_index = numpy.where(
+            right_count[group] == 0, -1,
+            right_order[numpy.minimum(right_position,
+                                      max(right_length - 1, 0))]
+            if right_length > 0 else -1)
+
+        common_columns = (set(left) & set(right)) - set(self.key)
+        result = {}
+        for column, values in left.items():
+            name = "left_" + column if column in common_columns else column
+            result[name] = _gather(values, left_index)
+
+        for column, values in right.items():
+            name = "right_" + column if column in common_columns else column
+            if name in result:
+                mask = left_index < 0
+                if numpy.any(mask):
+                    merged = result[name].astype(object)
+                    merged[mask] = _gather(values, right_index)[mask]
+                    result[name] = merged
+            else:
+                result[name] = _gather(values, right_index)
+
+        if len(group) > 0:
+            yield {name: result[name] for name in sorted(result)}
+
+
+class Fold(Node):
+    """ Node class which provides Fold operation. """
+
+    def __init__(self, function, start_state, input=None,
+                 output=None, name=None, combine=None, workers=None,
+                 chunk_size=1000):
+        """
+        :param function: function to apply in fold operation.
+        :param start_state: start state for fold operation.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node object.
+        :param combine: associative function combine(state_a, state_b)
+        which merges states folded from two consecutive parts of input.
+        :param workers: number of worker processes. If it is not None then
+        chunks of input are folded in workers from copies of start_state
+        and partial states are combined in a tree. combine is required.
+        :param chunk_size: number of input rows folded by worker at once.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.fold_function = function
+        self.start_state = copy.deepcopy(start_state)
+        self.state = start_state
+        self.combine = combine
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        # self.increment is a dict with persisted state of incremental
+        # computation (see Graph.run with state_file) or None.
+        self.increment = None
+
+        if workers is not None and combine is None:
+            raise ValueError("Parallel fold requires combine function\n")
+
+    def _parameters(self):
+        return {"function": self.fold_function,
+                "start_state": self.start_state,
+                "combine": self.combine}
+
+    def _estimate(self, rows, sample, estimates):
+        return 1, rows, None
+
+    def run(self):
+        """
+        Apply fold operation to result of input Node object.
+        Every run starts from a copy of start_state (or from persisted
+        state in incremental computation).
+        """
+        if self.increment is not None:
+            state = self.increment.get("state")
+            if state is None:
+                state = copy.deepcopy(self.start_state)
+            for value in self.input.run():
+                state = self.fold_function(state, value)
+            self.increment["state"] = self.state = state
+            yield state
+            return
+
+        if self.workers is not None:
+            self.state = self._parallel_fold(self.input.run())
+        else:
+            self.state = copy.deepcopy(self.start_state)
+            for value in self.input.run():
+                self.state = self.fold_function(self.state, value)
+
+        yield self.state
+
+    def run_batches(self, batch_size):
+        """ Apply fold operation to rows of batches of input Node. """
+        if self.workers is not None:
+            rows = chain.from_iterable(self.input.run_batches(batch_size))
+            self.state = self._parallel_fold(rows)
+        else:
+            function = self.fold_function
+            state = copy.deepcopy(self.start_state)
+            for batch in self.input.run_batches(batch_size):
+                for value in batch:
+                    state = function(state, value)
+            self.state = state
+
+        yield [self.state]
+
+    def run_columns(self):
+        """ Apply fold operation to rows of column batches. """
+        rows = (value for batch in self.input.run_columns()
+                for value in _columns_to_rows(batch))
+
+        if self.workers is not None:
+            self.state = self._parallel_fold(rows)
+        else:
+            self.state = copy.deepcopy(self.start_state)
+            for value in rows:
+                self.state = self.fold_function(self.state, value)
+
+        yield _rows_to_columns([self.state])
+
+    def _parallel_fold(self, rows):
+        """
+        1. Fold chunks of rows in worker processes, every chunk is folded
+        from a fresh copy of start_state.
+        2. Combine partial states of neighbour chunks pairwise in a tree
+        until one state is left. Order of chunks is preserved, so combine
+        needs to be associative but not commutative.
+        :return: final state.
+        """
+        _check_picklable(self.fold_function, self)
+        _check_picklable(self.combine, self)
+
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            states = []
+            pending = deque()
+            for chunk in _chunks(rows, self.chunk_size):
+                pending.append(executor.submit(_fold_chunk,
+                                               self.fold_function,
+                                               self.start_state, chunk))
+                if len(pending) >= 2 * self.workers:
+                    states.append(pending.popleft().result())
+            states.extend(future.result() for future in pending)
+
+            if len(states) == 0:
+                return copy.deepcopy(self.start_state)
+
+            while len(states) > 1:
+                combined = list(executor.map(self.combine, states[0::2],
+                                             states[1::2]))
+                if len(states) % 2 == 1:
+                    combined.append(states[-1])
+                states = combined
+
+        return states[0]
+
+
+class Reduce(Node):
+    """ Node class which provides Reduce operation. """
+
+    def __init__(self, operation, key=None, input=None,
+                 output=None, name=None, workers=None):
+        """
+        :param operation: generator with reduce operation.
+        :param key: string or list of string with keys.
+        :param input: input Node object.
+        :param output: output Node object.
+        :param name: name of this Node.
+        :param workers: number of worker processes. If it is not None then
+        rows are hash-partitioned by key and every partition is reduced in
+        a separate process. If input Node object is Sort then sorting is
+        done in workers too. Operation should be picklable.
+        """
+        super().__init__(input=input, output=output, name=name)
+        self.operation = operation
+        self.workers = workers
+
+        if isinstance(key, str):
+            self.key = [key]
+        else:
+            self.key = key
+
+        # self.increment is a dict with persisted state of incremental
+        # computation (see Graph.run with state_file) or None.
+        self.increment = None
+
+    def run(self):
+        """
+        Make blocks with equal keys from result of input Node object,
+        pass these blocks to reduce generator and yield value from it
+        :return:
+        """
+        if self.increment is not None:
+            yield from self._run_increment()
+        elif self.key is None:
+            yield from self.operation(list(self.input.run()))
+        elif self.workers is not None:
+            yield from self._parallel_run()
+        else:
+
+            previous_key = None
+            stack = []
+
+            for current_value in self.input.run():
+
+                current_key = {key: current_value[key] for key in self.key}
+
+                if previous_key is None:
+                    stack.append(current_value)
+                else:
+                    if current_key == previous_key:
+                        stack.append(current_value)
+                    else:
+                        yield from self.operation(stack)
+                        stack = [current_value]
+
+                previous_key = current_key
+
+            if len(stack) > 0:
+                yield from self.operation(stack)
+
+    def run_batches(self, batch_size):
+        """
+        Pass blocks with equal keys from batches of input Node object to
+        reduce generator. Blocks can continue from one batch to the next.
+        """
+        if self.workers is not None:
+            yield from super().run_batches(batch_size)
+            return
+
+        batches = self.input.run_batches(batch_size)
+        if self.key is None:
+            rows = []
+            for batch in batches:
+                rows.extend(batch)
+            yield from _chunks(self.operation(rows), batch_size)
+            return
+
+        result = []
+        rows = chain.from_iterable(batches)
+        for _, block in groupby(rows, key=itemgetter(*self.key)):
+            result.extend(self.operation(list(block)))
+            if len(result) >= batch_size:
+                yield result
+                result = []
+
+        if len(result) > 0:
+            yield result
+
+    def run_columns(self):
+        """
+        Find bounds of blocks with equal keys in column batches with
+        vectorized comparison of neighbour rows and pass rows of every
+        block to reduce generator. The last block of a batch is carried
+        to the next batch because it can continue there.
+        """
+        if self.workers is not None:
+            yield from super().run_columns()
+            return
+
+        if self.key is None:
+            rows = []
+            for batch in self.input.run_columns():
+                rows.extend(_columns_to_rows(batch))
+
+            result = list(self.operation(rows))
+            if len(result) > 0:
+                yield _rows_to_columns(result)
+            return
+
+        carry = None
+        for batch in self.input.run_columns():
+            if carry is not None:
+                batch = _concat_batches([carry, batch])
+
+            length = _batch_length(batch)
+            changed = numpy.zeros(max(length - 1, 0), dtype=bool)
+            for key in self.key:
+                values = batch[key]
+                changed |= values[1:] != values[:-1]
+
+            bounds = numpy.flatnonzero(changed) + 1
+            last_start = int(bounds[-1]) if len(bounds) > 0 else 0
+            rows = _columns_to_rows(_take(batch, slice(0, last_start)))
+            result = []
+            for start, end in zip(chain([0], bounds[:-1]), bounds):
+                result.extend(self.operation(rows[start:end]))
+
+            if len(result) > 0:
+                yield _rows_to_columns(result)
+            carry = _take(batch, slice(last_start, length))
+
+        if carry is not None and _batch_length(carry) > 0:
+            result = list(self.operation(_columns_to_rows(carry)))
+            if len(result) > 0:
+                yield _rows_to_columns(result)
+
+    def _parameters(self):
+        return {"operation": self.operation, "key": self.key}
+
+    def _output_ordering(self, input_ordering):
+        if self.key is None:
+            return []
+        return _key_prefix(input_ordering, self.key)
+
+    def _estimate(self, rows, sample, estimates):
+        if self.key is None:
+            if not sample:
+                return rows, rows, None
+            result = list(self.operation(sample))
+            return _scale(rows, len(result) / len(sample)), rows, result
+        return _reduce_estimate(self.operation, self.key, rows, sample)
+
+    def _run_increment(self):
+        """
+        Incremental computation. Rows of every key are persisted in
+        self.increment, new rows are added to their blocks and only
+        blocks of keys from new rows are reduced again.
+
+        All input rows are kept in the state and the whole state is saved
+        after every run, so its cost grows with total size of input (not
+        only with new lines). GroupBy with aggregations keeps one payload
+        per key instead.
+        """
+        get_key = _tuple_getter(self.key or [])
+        blocks = self.increment.setdefault("groups", {})
+        affected = {}
+        for value in self.input.run():
+            key = get_key(value)
+            blocks.setdefault(key, []).append(value)
+            affected[key] = True
+
+        for key in affected:
+            # Reducer gets a copy because it can change rows of block.
+            yield from self.operation(copy.deepcopy(blocks[key]))
+
+    def _parallel_run(self):
+        """
+        Local shuffle.
+
+        1. Write rows to one of self.workers partition files by hash of key.
+        2. Sort (if input Node object is Sort) and reduce every partition
+        in a separate worker process.
+        3. Merge outputs of partitions by sort key (or position) of the
+        first row of every block, so the result is the same as in serial
+        Sort and Reduce.
+        """
+        _check_picklable(self.operation, self)
+
+        source = self.input
+        by = None
+        if isinstance(self.input, Sort):
+            source = self.input.input
+            by = self.input.by
+            if list(self.key) != by[:len(self.key)]:
+                raise ValueError("Key of {} should be a prefix of key of {} "
+                                 "to reduce in parallel".format(self,
+                                                                self.input))
+
+        get_key = itemgetter(*self.key)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, "partition_{}".format(i))
+                     for i in range(self.workers)]
+            files = [open(path, "wb") for path in paths]
+            buffers = [[] for _ in paths]
+
+            for index, value in enumerate(source.run()):
+                partition = hash(get_key(value)) % self.workers
+                buffers[partition].append((index, value))
+                if len(buffers[partition]) == SPILL_CHUNK_SIZE:
+                    pickle.dump(buffers[partition], files[partition],
+                                pickle.HIGHEST_PROTOCOL)
+                    buffers[partition] = []
+
+            for file, buffer in zip(files, buffers):
+                if len(buffer) > 0:
+                    pickle.dump(buffer, file, pickle.HIGHEST_PROTOCOL)
+                file.close()
+
+            with concurrent.futures.ProcessPoolExecutor(
+                    self.workers) as executor:
+                results = list(executor.map(_reduce_partition, paths,
+                                            repeat(self.operation),
+                                            repeat(self.key), repeat(by)))
+
+        for _, outputs in heapq.merge(*results, key=itemgetter(0)):
+            yield from outputs
+
+
+class Count(object):
+    """ Aggregator for GroupBy which counts rows in group. """
+
+    def start(self):
+        return 0
+
+    def update(self, state, row):
+        return state + 1
+
+    def merge(self, first_state, second_state):
+        return first_state + second_state
+
+    def result(self, state):
+        return state
+
+
+class Sum(object):
+    """ Aggregator for GroupBy which sums values of column in group. """
+
+    def __init__(self, column):
+        """ :param column: name of column. """
+        self.column = column
+
+    def start(self):
+        return 0
+
+    def update(self, state, row):
+        return state + row[self.column]
+
+    def merge(self, first_state, second_state):
+        return first_state + second_state
+
+    def result(self, state):
+        return state
+
+
+class Min(object):
+    """ Aggregator for GroupBy which finds minimum of column in group. """
+
+    def __init__(self, column):
+        """ :param column: name of column. """
+        self.column = column
+
+    def start(self):
+        return None
+
+    def update(self, state, row):
+        value = row[self.column]
+        if state is None or value < state:
+            return value
+        return state
+
+    def merge(self, first_state, second_state):
+        if first_state is None:
+            return second_state
+        if second_state is None or first_state <= second_state:
+            return first_state
+        return second_state
+
+    def result(self, state):
+        return state
 
-        :param name: name of current Node object.
-        """
-        super().__init__(input=input, output=output, name=name)
-        self.input_file = input_file
 
-        if isinstance(input, Graph):
-            self.input_graph = input
-            self.input = None
-        else:
-            self.input_graph = None
+class Max(Min):
+    """ Aggregator for GroupBy which finds maximum of column in group. """
 
-    def run(self):
-        """
-        Yield values from input source.
+    def update(self, state, row):
+        value = row[self.column]
+        if state is None or value > state:
+            return value
+        return state
 
-        If Graph object is passed as input, values will be yielded from result
-        of input Graph which is already calculated (check topological sort).
+    def merge(self, first_state, second_state):
+        if first_state is None:
+            return second_state
+        if second_state is None or first_state >= second_state:
+            return first_state
+        return second_state
 
-        If input is a list of dicts, values will be yielded from that list.
 
-        If input is None then input_file will be opened and values will be
-        yielded from input_file.
+class Mean(Sum):
+    """ Aggregator for GroupBy which finds mean of column in group. """
 
-        :return: yield value from input list, input file or input Graph object
-        """
-        if self.input_graph is None:
-            if self.input is None:
-                with open(self.input_file, "r") as file:
-                    for line in file.readlines():
-                        yield json.loads(line)
-            else:
-                for value in self.input:
-                    yield value
-        else:
-            for value in self.input_graph.res:
-                yield value
+    def start(self):
+        return 0, 0
 
+    def update(self, state, row):
+        return state[0] + row[self.column], state[1] + 1
 
-class Map(Node):
-    """ Node class which provides Map operation. """
+    def merge(self, first_state, second_state):
+        return (first_state[0] + second_state[0],
+                first_state[1] + second_state[1])
+
+    def result(self, state):
+        return state[0] / state[1]
+
+
+class GroupBy(Node):
+    """
+    Node class which groups rows by key in hash table, so input
+    does not need to be sorted.
+    """
 
-    def __init__(self, operation, input=None, output=None, name=None):
+    def __init__(self, operation=None, key=None, input=None, output=None,
+                 name=None, aggregations=None, memory_limit=None,
+                 partitions=16):
         """
-        :param operation: map generator to apply for input values.
+        :param operation: generator with reduce operation which takes
+        list of rows with equal keys (similar to Reduce).
+        :param key: string or list of string with keys.
         :param input: input Node object.
         :param output: output Node object.
-        :param name: name of this Node object.
+        :param name: name of this Node.
+        :param aggregations: dict {column: aggregator} which is used
+        instead of operation. Aggregators (Count, Sum, Min, Max, Mean)
+        update state of group with every row, so rows are not stored.
+        Result row contains key columns and columns of aggregations.
+
+        :param memory_limit: approximate number of bytes of groups which
+        can be kept in memory. If it is exceeded then groups are spilled
+        to temporary partition files by hash of key and every partition
+        is grouped separately at the end. None means no limit.
+        :param partitions: number of partition files for spilling.
+
+        Groups are yielded in order of the first row of every group
+        (or partition by partition if groups were spilled).
         """
         super().__init__(input=input, output=output, name=name)
         self.operation = operation
+        self.aggregations = aggregations
+        self.memory_limit = memory_limit
+        self.partitions = partitions
+
+        # self.increment is a dict with persisted state of incremental
+        # computation (see Graph.run with state_file) or None.
+        self.increment = None
+
+        if isinstance(key, str):
+            self.key = [key]
+        elif key is None:
+            raise ValueError("GroupBy requires key\n")
+        else:
+            self.key = list(key)
+
+        if (operation is None) == (aggregations is None):
+            raise ValueError("GroupBy requires either operation "
+                             "or aggregations\n")
+
+    def _parameters(self):
+        return {"operation": self.operation, "key": self.key,
+                "aggregations": self._aggregation_parameters()}
+
+    def _output_ordering(self, input_ordering):
+        if self.memory_limit is not None:
+            return []
+        return _key_prefix(input_ordering, self.key)
+
+    def _estimate(self, rows, sample, estimates):
+        if self.operation is None:
+            return _groups(rows, sample, self.key), rows, None
+        return _reduce_estimate(self.operation, self.key, rows, sample)
+
+    def _aggregation_parameters(self):
+        if self.aggregations is None:
+            return None
+        return {column: (type(aggregator).__name__, vars(aggregator))
+                for column, aggregator in self.aggregations.items()}
 
     def run(self):
         """
-        Apply map operation to each value from output of input Node object and
-        then yield it forward to Graph computations.
+        Put every row to its group in hash table and yield results
+        of groups at the end.
         """
-        for value in self.input.run():
-            yield from self.operation(value)
+        if self.increment is not None:
+            yield from self._run_increment()
+            return
 
+        get_key = _tuple_getter(self.key)
+        groups = {}
+        groups_size = 0
+        files = None
 
-class Sort(Node):
-    """ Node class which provides Sort operation. """
+        for value in self.input.run():
+            key = get_key(value)
+            payload = groups.get(key)
+            if payload is None:
+                payload = self._start()
+                groups[key] = payload
+                groups_size += sys.getsizeof(key) + sys.getsizeof(payload)
+
+            if self.aggregations is None:
+                payload.append(value)
+                groups_size += _row_size(value)
+            else:
+                for i, aggregator in enumerate(self.aggregations.values()):
+                    payload[i] = aggregator.update(payload[i], value)
+
+            if self.memory_limit is not None and \
+                    groups_size > self.memory_limit:
+                if files is None:
+                    files = [tempfile.TemporaryFile()
+                             for _ in range(self.partitions)]
+                self._spill_groups(groups, files)
+                groups = {}
+                groups_size = 0
+
+        if files is None:
+            yield from self._finish(groups)
+            return
+
+        self._spill_groups(groups, files)
+        for file in files:
+            file.seek(0)
+            groups = {}
+            for key, payload in _read_spilled(file):
+                if key in groups:
+                    groups[key] = self._merge(groups[key], payload)
+                else:
+                    groups[key] = payload
+            yield from self._finish(groups)
 
-    def __init__(self, by, input=None, output=None, name=None):
+    def _run_increment(self):
         """
-        :param by: string or list of keys.
-        :param input: input Node object.
-        :param output: output Node object.
-        :param name: name of this Node.
+        Incremental computation. Payloads of groups are persisted in
+        self.increment and updated by new rows, only groups of keys from
+        new rows are yielded.
         """
-        super().__init__(input=input, output=output, name=name)
-        if isinstance(by, str):
-            self.by = [by]
-        elif isinstance(by, list):
-            self.by = by
-        else:
-            raise ValueError("Unknown type for _by_ value\n")
+        get_key = _tuple_getter(self.key)
+        groups = self.increment.setdefault("groups", {})
+        affected = {}
+        for value in self.input.run():
+            key = get_key(value)
+            payload = groups.get(key)
+            if payload is None:
+                payload = self._start()
+                groups[key] = payload
+
+            if self.aggregations is None:
+                payload.append(value)
+            else:
+                for i, aggregator in enumerate(self.aggregations.values()):
+                    payload[i] = aggregator.update(payload[i], value)
+            affected[key] = payload
+
+        if self.aggregations is None:
+            affected = {key: copy.deepcopy(payload)
+                        for key, payload in affected.items()}
+        yield from self._finish(affected)
+
+    def _start(self):
+        """ :return: empty payload of a new group. """
+        if self.aggregations is None:
+            return []
+        return [aggregator.start()
+                for aggregator in self.aggregations.values()]
+
+    def _merge(self, first_payload, second_payload):
+        """ Merge payloads of one group from different spills. """
+        if self.aggregations is None:
+            first_payload.extend(second_payload)
+            return first_payload
+        return [aggregator.merge(first, second)
+                for aggregator, first, second in
+                zip(self.aggregations.values(), first_payload,
+                    second_payload)]
+
+    def _spill_groups(self, groups, files):
+        """ Append (key, payload) pairs to partition files by hash of key. """
+        buffers = [[] for _ in files]
+        for key, payload in groups.items():
+            buffers[hash(key) % len(files)].append((key, payload))
+
+        for file, buffer in zip(files, buffers):
+            for chunk in _chunks(buffer, SPILL_CHUNK_SIZE):
+                pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+
+    def _finish(self, groups):
+        """ Yield results of groups. """
+        for key, payload in groups.items():
+            if self.aggregations is None:
+                yield from self.operation(payload)
+            else:
+                value = dict(zip(self.key, key))
+                for (column, aggregator), state in zip(
+                        self.aggregations.items(), payload):
+                    value[column] = aggregator.result(state)
+                yield value
 
-    def run(self):
-        """
-        Sort a result of input Node object work.
-        :return: yield sorted values from previous node
-        """
-        result = list(self.input.run())
-        result = sorted(result, key=itemgetter(*self.by))
-        for value in result:
-            yield value
 
+class _Reversed(object):
+    """ Heap item with reversed order (turns heapq into max-heap). """
 
-class Join(Node):
-    """ Node class which provides Join operation. """
+    __slots__ = ("order", "value")
 
-    def __init__(self, on, key, strategy, input=None, output=None, name=None):
-        """
-        :param on: Graph object which is joined.
-        Graph object is always LEFT for joining operation.
+    def __init__(self, order, value):
+        self.order = order
+        self.value = value
 
-        :param key: string or list of string. Keys for join operation
-        :param strategy: string. SQL strategy of join. Supports inner, outer,
-        left and right strategies.
+    def __lt__(self, other):
+        return other.order < self.order
+
+
+class TopK(Node):
+    """
+    Node class which yields k first rows by order of columns (for every
+    group or for the whole table) using bounded heaps.
+    """
 
+    def __init__(self, k, by, key=None, input=None, output=None, name=None,
+                 reverse=False):
+        """
+        :param k: number of rows to keep in every group.
+        :param by: string or list of keys which define order of rows.
+        :param key: string or list of keys of groups. None means that
+        the whole table is one group.
         :param input: input Node object.
         :param output: output Node object.
         :param name: name of this Node.
+        :param reverse: if True then rows with the largest values are kept
+        (descending order), otherwise rows with the smallest values.
+
+        Result is the same as sorted(rows, reverse=reverse)[:k] for every
+        group. Groups are yielded in order of their first rows.
+        Works with O(N log k) time and O(k * groups) memory.
         """
         super().__init__(input=input, output=output, name=name)
-        self.graph = on
-        self.strategy = strategy
+        self.k = k
+        self.reverse = reverse
+
+        if isinstance(by, str):
+            self.by = [by]
+        else:
+            self.by = list(by)
 
         if isinstance(key, str):
             self.key = [key]
+        elif key is None:
+            self.key = []
         else:
-            if len(key) > 0:
-                self.key = key
-            else:
-                self.key = []
-                if self.strategy == "outer":
-                    self.strategy = "cross"
+            self.key = list(key)
+
+    def _parameters(self):
+        return {"k": self.k, "by": self.by, "key": self.key,
+                "reverse": self.reverse}
+
+    def _output_ordering(self, input_ordering):
+        return _key_prefix(input_ordering, self.key)
+
+    def _estimate(self, rows, sample, estimates):
+        if rows is None:
+            return None, None, None
+        groups = _groups(rows, sample, self.key) if self.key else 1
+        cost = int(rows * math.log2(max(self.k, 2)))
+        return min(rows, self.k * groups), cost, None
 
     def run(self):
         """
-        Join two lists of dicts and then yield values
-        from the result of joining.
+        Keep heap with at most k rows for every group. The smallest
+        of kept rows is on the top of heap when the largest rows are
+        needed and vice versa, so it is replaced by a better row.
+        Index of row breaks ties, so order of equal rows is stable.
+        """
+        if self.k <= 0:
+            return
 
-        Joining function works through Sort and Reduce operations.
+        get_key = _tuple_getter(self.key)
+        get_order = _tuple_getter(self.by)
+        heaps = {}
 
-        Work with N log N asymptotics.
-        Distribute work of joining to different strategies function of joining.
+        for index, value in enumerate(self.input.run()):
+            if self.reverse:
+                item = ((get_order(value), -index), value)
+            else:
+                item = _Reversed((get_order(value), index), value)
 
-        If dicts in left table and right table have common names of columns
-        then add "left_" and "right_" prefix to these names in result columns
-        (if common columns are not in self.key).
-        """
+            heap = heaps.setdefault(get_key(value), [])
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif heap[0] < item:
+                heapq.heapreplace(heap, item)
 
-        # self.res is a result of input Graph object. This value could not
-        # be calculated on initialization step.
-        # self.output is a result of input Node work.
+        for heap in heaps.values():
+            if self.reverse:
+                for _, value in sorted(heap, reverse=True):
+                    yield value
+            else:
+                for item in sorted(heap, key=lambda item: item.order):
+                    yield item.value
 
-        self.res = self.graph.res
-        self.output = list(self.input.run())
 
-        common_columns = (set(self.res[0].keys()) &
-                          set(self.output[0].keys())) - set(self.key)
+class NodeMetrics(object):
+    """
+    Metrics of Node object which are collected by Graph.run(profile=True).
+
+    total_time is time spent in generator of node including time of
+    upstream nodes, wait_time is time spent in upstream nodes and
+    self_time is their difference. peak_memory is the largest amount of
+    memory in bytes allocated during one step of generator of node
+    (including upstream nodes), it is measured with tracemalloc. Peak of
+    tracemalloc is process-wide, so when graphs are computed concurrently
+    (workers or graphs which share a Tee) peak_memory also includes
+    allocations of other threads and is only an upper bound.
+    """
 
-        for column in common_columns:
-            for left in self.res:
-                left["left_" + column] = left.pop(column)
+    def __init__(self):
+        self.rows_in = 0
+        self.rows_out = 0
+        self.total_time = 0.0
+        self.wait_time = 0.0
+        self.self_time = 0.0
+        self.peak_memory = 0
+        # self.active is True while generator of node makes a step, so
+        # nested calls of the same node (adapters) are not measured twice.
+        self.active = False
+
+    def as_dict(self):
+        return {"rows_in": self.rows_in, "rows_out": self.rows_out,
+                "total_time": self.total_time, "wait_time": self.wait_time,
+                "self_time": self.self_time,
+                "peak_memory": self.peak_memory}
+
+
+class _MemoryTracker(threading.local):
+    """
+    Attributes tracemalloc peaks to nested steps of generators. Peak is
+    reset when step of generator starts, so peak of the outer step is
+    collected from peaks of its inner steps.
+    """
 
-            for right in self.output:
-                right["right_" + column] = right.pop(column)
+    def __init__(self):
+        # self.stack is a list of [memory at start, peak of inner steps].
+        self.stack = []
 
-        self.left_keys = list(self.res[0].keys())
-        self.right_keys = list(self.output[0].keys())
+    def enter(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self.stack) > 0:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
+        self.stack.append([current, 0])
+        tracemalloc.reset_peak()
 
-        if self.strategy == "inner":
-            yield from self._inner_run()
+    def exit(self, metrics):
+        start, inner_peak = self.stack.pop()
+        peak = max(inner_peak, tracemalloc.get_traced_memory()[1])
+        metrics.peak_memory = max(metrics.peak_memory, peak - start)
+        if len(self.stack) > 0:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
 
-        elif self.strategy == "left":
-            yield from self._left_run()
 
-        elif self.strategy == "right":
-            yield from self._right_run()
+_memory_tracker = _MemoryTracker()
 
-        elif self.strategy == "outer":
-            yield from self._outer_run()
 
-        elif self.strategy == "cross":
-            yield from self._cross_run()
+def _profiled(method, metrics, count):
+    """
+    :param method: run, run_batches or run_columns method of Node object.
+    :param metrics: NodeMetrics object of this Node object.
+    :param count: function which returns number of rows in yielded item.
+    :return: generator function which yields items of method and
+    collects metrics.
+    """
+    def run(*args):
+        if metrics.active:
+            yield from method(*args)
+            return
+
+        iterator = method(*args)
+        while True:
+            metrics.active = True
+            _memory_tracker.enter()
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                metrics.total_time += time.perf_counter() - start
+                _memory_tracker.exit(metrics)
+                metrics.active = False
+
+            metrics.rows_out += count(item)
+            yield item
+
+    return run
+
+
+class _ProfiledNodes(object):
+    """
+    Nodes whose methods are wrapped by _profiled. Nodes of prefix which
+    is shared through a Tee are in plans of several graphs which are
+    computed concurrently, such node is wrapped once and its metrics are
+    shared by these graphs. tracemalloc is traced while any node is
+    profiled.
+    """
 
-    def _inner_reducer(self, records):
+    def __init__(self):
+        self._lock = threading.Lock()
+        # self._nodes is a dict {node: [metrics, number of graphs]}.
+        self._nodes = {}
+        # self._tracing is True if tracemalloc was started here.
+        self._tracing = False
+
+    def acquire(self, node):
+        """ :return: NodeMetrics object of node (wrapped if it is new). """
+        with self._lock:
+            if len(self._nodes) == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+
+            entry = self._nodes.get(node)
+            if entry is None:
+                metrics = NodeMetrics()
+                node.run = _profiled(node.run, metrics, lambda item: 1)
+                node.run_batches = _profiled(node.run_batches, metrics, len)
+                node.run_columns = _profiled(node.run_columns, metrics,
+                                             _batch_length)
+                entry = self._nodes[node] = [metrics, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, node):
         """
-        :param records: records with similar keys.
-        :return: yield values from INNER join table.
+        :return: True if node is not profiled by other graphs anymore,
+        then its methods are restored.
         """
-        if len(records) > 1:
-            first_elem_keys = records[0].keys()
-            second_elem_keys = records[1].keys()
-            flag = False
-
-            for first_key, second_key in zip(first_elem_keys,
-                                             second_elem_keys):
-                if first_key != second_key:
-                    flag = True
-                    break
+        with self._lock:
+            entry = self._nodes[node]
+            entry[1] -= 1
+            if entry[1] > 0:
+                return False
 
-            if flag:
-                for value in records[1:]:
-                    value.update(records[0])
-                    new_value = {}
-                    for key in sorted(value):
-                        new_value[key] = value[key]
-                    yield new_value
+            del self._nodes[node]
+            for method in ("run", "run_batches", "run_columns"):
+                node.__dict__.pop(method, None)
+            if len(self._nodes) == 0 and self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+            return True
 
-            else:
-                for value in records[:-1]:
-                    value.update(records[-1])
-                    new_value = {}
-                    for key in sorted(value):
-                        new_value[key] = value[key]
-                    yield new_value
-
-    def _inner_run(self):
-        """
-        1. Sort input tables.
-        2. Create mini Graph object with only one Reduce Node
-        object with _inner_reducer operation.
-        3. Run this mini Graph object.
-        :return: yield values from INNER joined table.
-        """
-        summary = sorted(self.res + self.output, key=itemgetter(*self.key))
-        current_input = Input(input=summary)
-        reducer = Reduce(self._inner_reducer, key=self.key)(current_input)
-        current_graph = Graph(input_node=current_input, output_node=reducer)
-        yield from current_graph.run()
-
-    def _left_reducer(self, records):
-        """
-        :param records: records with similar keys.
-        :return: yield values from LEFT joined table.
-        """
-        if len(records) > 1:
-            yield from self._inner_reducer(records)
-
-        if len(records) == 1:
-            for k1, k2 in zip(records[0].keys(), self.left_keys):
-                if k1 != k2:
-                    break
-            else:
-                records[0].update({key: None for key in self.right_keys
-                                  if key not in self.left_keys})
-
-                new_value = {}
-                for key in sorted(records[0]):
-                    new_value[key] = records[0][key]
-                yield new_value
-
-    def _left_run(self):
-        """
-        1. Sort input tables.
-        2. Create mini Graph object with only one Reduce Node
-        object with _inner_reducer operation.
-        3. Run this mini Graph object.
-        :return: yield values from LEFT joined table.
-        """
-        summary = sorted(self.res + self.output, key=itemgetter(*self.key))
-        current_input = Input(summary)
-        reducer = Reduce(self._left_reducer, key=self.key)(current_input)
-        current_graph = Graph(input_node=current_input, output_node=reducer)
-        yield from current_graph.run()
-
-    def _right_reducer(self, records):
-        """ Similar to _left_reducer. """
-        if len(records) > 1:
-            yield from self._inner_reducer(records)
-
-        if len(records) == 1:
-            for k1, k2 in zip(records[0].keys(), self.right_keys):
-                if k1 != k2:
-                    break
-            else:
-                records[0].update({key: None for key in self.left_keys
-                                   if key not in self.right_keys})
-
-                new_value = {}
-                for key in sorted(records[0]):
-                    new_value[key] = records[0][key]
-                yield new_value
-
-    def _right_run(self):
-        """ Similar to _left_run. """
-        summary = sorted(self.output + self.res, key=itemgetter(*self.key))
-        current_input = Input(summary)
-        reducer = Reduce(self._right_reducer, key=self.key)(current_input)
-        current_graph = Graph(input_node=current_input, output_node=reducer)
-        yield from current_graph.run()
-
-    def _outer_reducer(self, records):
-        """ Similar to _left_reducer. """
-        if len(records) > 1:
-            yield from self._inner_reducer(records)
-
-        if len(records) == 1:
-            value = {key: value for key, value in records[0].items()}
-
-            for k1, k2 in zip(records[0].keys(), self.right_keys):
-
-                if k1 != k2:
-                    value.update({key: None for key in self.right_keys
-                                       if key not in self.left_keys})
-                    break
 
-            else:
-                value.update({key: None for key in self.left_keys
-                                   if key not in self.right_keys})
+_profiled_nodes = _ProfiledNodes()
 
-            new_value = {}
-            for key in sorted(value):
-                new_value[key] = value[key]
-            yield new_value
 
-    def _outer_run(self):
-        """ Similar to _left_run. """
-        summary = sorted(self.output + self.res, key=itemgetter(*self.key))
-        current_input = Input(summary)
-        reducer = Reduce(self._outer_reducer, key=self.key)(current_input)
-        current_graph = Graph(input_node=current_input, output_node=reducer)
-        yield from current_graph.run()
+class CachedResult(object):
+    """
+    Result of graph which is stored in ResultCache. Rows are streamed
+    from disk every time when this object is iterated.
+    """
 
-    def _cross_run(self):
+    def __init__(self, path, length):
         """
-        Run when strategy == 'outer' and key is None.
-        :return: yield value from CROSS joined table.
+        :param path: path to file with cached rows.
+        :param length: number of rows.
         """
-        for first_dict in self.res:
-            for second_dict in self.output:
-                first_dict.update(second_dict)
-                new_value = {}
-                for key in sorted(first_dict):
-                    new_value[key] = first_dict[key]
-                yield new_value
+        self.path = path
+        self.length = length
 
+    def __len__(self):
+        return self.length
 
-class Fold(Node):
-    """ Node class which provides Fold operation. """
+    def __iter__(self):
+        file = open(self.path, "rb")
+        pickle.load(file)
+        return _read_spilled(file)
 
-    def __init__(self, function, start_state, input=None,
-                 output=None, name=None):
-        """
-        :param function: function to apply in fold operation.
-        :param start_state: start state for fold operation.
-        :param input: input Node object.
-        :param output: output Node object.
-        :param name: name of this Node object.
-        """
-        super().__init__(input=input, output=output, name=name)
-        self.fold_function = function
-        self.state = start_state
 
-    def run(self):
-        """ Apply fold operation to result of input Node object. """
-        for value in self.input.run():
-            self.state = self.fold_function(self.state, value)
+class SpilledResult(object):
+    """
+    Result of graph which is stored in binary file on disk and read back
+    through mmap. Every row is pickled separately, so rows can be read by
+    index. Rows are unpickled directly from memory-mapped file without
+    copying of file content.
+
+    File layout: pickled rows, array of offsets of rows (8 bytes per
+    offset, the last offset is the end of rows) and the number of rows
+    (8 bytes).
+    """
 
-        yield self.state
+    def __init__(self, path):
+        """ :param path: path to file which was written by write(). """
+        self.path = path
+        with open(path, "rb") as file:
+            file.seek(-8, os.SEEK_END)
+            self.length = array("Q", file.read(8))[0]
+            file.seek(-8 * (self.length + 2), os.SEEK_END)
+            self.offsets = array("Q", file.read(8 * (self.length + 1)))
+
+    @classmethod
+    def write(cls, path, rows):
+        """
+        Write rows to file.
+        :param path: path to file.
+        :param rows: iterable of rows.
+        :return: SpilledResult object.
+        """
+        offsets = array("Q", [0])
+        with open(path, "wb") as file:
+            for row in rows:
+                file.write(pickle.dumps(row, pickle.HIGHEST_PROTOCOL))
+                offsets.append(file.tell())
+            file.write(offsets.tobytes())
+            file.write(array("Q", [len(offsets) - 1]).tobytes())
+        return cls(path)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("SpilledResult index out of range")
+
+        with open(self.path, "rb") as file:
+            file.seek(self.offsets[index])
+            return pickle.loads(file.read(self.offsets[index + 1] -
+                                          self.offsets[index]))
+
+    def __iter__(self):
+        if self.length == 0:
+            return
+
+        with open(self.path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    offsets = self.offsets
+                    for i in range(self.length):
+                        yield pickle.loads(view[offsets[i]:offsets[i + 1]])
+                finally:
+                    view.release()
+
+    def remove(self):
+        """ Remove file with rows. """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ResultCache(object):
+    """
+    Persistent on-disk cache of results of Graph objects.
 
+    Result is stored with a fingerprint of graph which depends on nodes
+    and their parameters, code of user operations (with values of their
+    closures and of immutable globals they use), fingerprints of input
+    graphs and fingerprints of input files (path, size and modification
+    time or hash of content). If anything of it changes, graph is
+    recomputed.
 
-class Reduce(Node):
-    """ Node class which provides Reduce operation. """
+    When total size of cached results exceeds max_bytes, least recently
+    used results are removed.
+    """
 
-    def __init__(self, operation, key=None, input=None,
-                 output=None, name=None):
+    def __init__(self, directory, max_bytes=None, hash_content=False):
         """
-        :param operation: generator with reduce operation.
-        :param key: string or list of string with keys.
-        :param input: input Node object.
-        :param output: output Node object.
-        :param name: name of this Node.
+        :param directory: path to directory with cached results.
+        :param max_bytes: maximal total size of cached results in bytes.
+        None means that size is not bounded.
+        :param hash_content: if True then fingerprint of input file is a
+        hash of its content, otherwise its size and modification time.
         """
-        super().__init__(input=input, output=output, name=name)
-        self.operation = operation
-
-        if isinstance(key, str):
-            self.key = [key]
-        else:
-            self.key = key
-
-    def run(self):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def fingerprint(self, graph):
+        """ :return: hex string which identifies result of graph. """
+        digest = hashlib.sha256()
+        _update_digest(digest, graph, self._update_file)
+        return digest.hexdigest()
+
+    def get(self, graph):
         """
-        Make blocks with equal keys from result of input Node object,
-        pass these blocks to reduce generator and yield value from it
-        :return:
+        :return: CachedResult object or None if there is
+        no result of graph in cache.
         """
-        if self.key is None:
-            yield from self.operation(list(self.input.run()))
+        path = self._path(graph)
+        try:
+            with open(path, "rb") as file:
+                length = pickle.load(file)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return CachedResult(path, length)
+
+    def put(self, graph, rows):
+        """
+        Save result of graph to cache.
+        :param graph: Graph object.
+        :param rows: iterable of rows which is a result of graph (results
+        with known length, e.g. SpilledResult, are streamed).
+        """
+        if not hasattr(rows, "__len__"):
+            rows = list(rows)
+        path = self._path(graph)
+        file = tempfile.NamedTemporaryFile(dir=self.directory, delete=False)
+        with file:
+            pickle.dump(len(rows), file, pickle.HIGHEST_PROTOCOL)
+            for chunk in _chunks(rows, SPILL_CHUNK_SIZE):
+                pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(file.name, path)
+        self._evict()
+
+    def invalidate(self, graph):
+        """ Remove result of graph from cache. """
+        try:
+            os.remove(self._path(graph))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """ Remove all results from cache. """
+        for path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _path(self, graph):
+        return os.path.join(self.directory,
+                            self.fingerprint(graph) + ".result")
+
+    def _entries(self):
+        return [os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".result")]
+
+    def _evict(self):
+        """ Remove least recently used results until size is bounded. """
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def _update_file(self, digest, path):
+        """ Add fingerprint of file to digest. """
+        stat = os.stat(path)
+        digest.update(os.path.abspath(path).encode())
+        digest.update(str(stat.st_size).encode())
+        if self.hash_content:
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
         else:
-
-            previous_key = None
-            stack = []
-
-            for current_value in self.input.run():
-
-                current_key = {key: current_value[key] for key in self.key}
-
-                if previous_key is None:
-                    stack.append(current_value)
-                else:
-                    if current_key == previous_key:
-                        stack.append(current_value)
-                    else:
-                        yield from self.operation(stack)
-                        stack = [current_value]
-
-                previous_key = current_key
-
-            if len(stack) > 0:
-                yield from self.operation(stack)
+            digest.update(str(stat.st_mtime_ns).encode())
 
 
 class Graph(object):
     """ Graph class for construct and run computing graphs. """
 
-    def __init__(self, input_node, output_node, name=None):
+    def __init__(self, input_node, output_node, name=None, optimize=False,
+                 batch_size=BATCH_SIZE):
         """
         :param input_node: input Node object. Type of input_node must
         be strictly Input Node.
 
         :param output_node: output Node object.
         :param name: name of this graph.
+        :param optimize: if True then graph is computed by optimized plan
+        (see _optimize), otherwise nodes are computed as they are written.
+        :param batch_size: number of rows in lists which are passed between
+        nodes by batch engine.
         """
         self.input_node = input_node
         self.output_node = output_node
         self.name = name
+        self.optimize = optimize
+        self.batch_size = batch_size
 
         # self._dependencies is a list of Graph objects with graphs
         # which necessary should be already computed.
@@ -477,7 +3185,19 @@ class Graph(object):
         # self.res is a result of computation of this graph.
         self.res = None
 
+        # self.timings is a dict {graph: (start, finish)} for dependencies.
+        self.timings = {}
+
+        # self.peak_retained_bytes is a peak memory which was taken by
+        # results of dependencies during the last verbose computation.
+        self.peak_retained_bytes = 0
+
+        # self.metrics is a dict {node: NodeMetrics} for nodes of plan
+        # from the last computation with profile=True.
+        self.metrics = {}
+
         self.nodes = self._create_node_list()
+        self._propagate_ordering()
         for node in self.nodes:
             if isinstance(node, Join):
                 if node.graph not in self._dependencies:
@@ -491,6 +3211,9 @@ class Graph(object):
 
         self._topological_sort()
 
+        # self.plan is a list of nodes which are computed by run().
+        self.plan = self._optimize() if optimize else self.nodes
+
     def _create_node_list(self):
         """
         Create list of nodes in Graph through moving backward from
@@ -508,6 +3231,152 @@ class Graph(object):
         result.append(self.input_node)
         return result[::-1]
 
+    def _optimize(self):
+        """
+        Create optimized plan from self.nodes. Nodes of self.nodes are not
+        changed, plan consists of their copies (except input node).
+
+        1. Remove Sort nodes which are elided because input is sorted.
+        2. Push Filter nodes below Sort and Project nodes, and below inner
+        and right Join if predicate uses only columns of join key (then
+        rows are filtered before joining).
+        3. Push Project nodes below Sort if columns contain keys of Sort,
+        so narrower rows are sorted.
+        4. Fuse consecutive Map nodes into one Map node.
+
+        Nodes before the last Branch node are shared with other graphs,
+        so they are not changed.
+        :return: list of nodes of plan.
+        """
+        shared = 1
+        for index, node in enumerate(self.nodes):
+            if isinstance(node, Branch):
+                shared = index + 1
+
+        plan = [node for node in self.nodes[shared:]
+                if not (isinstance(node, Sort) and node.elided)]
+        plan = [copy.copy(node) for node in plan]
+
+        moved = True
+        while moved:
+            moved = False
+            for i in range(1, len(plan)):
+                if self._can_push_down(plan[i], plan[i - 1]):
+                    plan[i - 1], plan[i] = plan[i], plan[i - 1]
+                    moved = True
+
+        fused = []
+        for node in plan:
+            if isinstance(node, Map) and node.workers is None and \
+                    len(fused) > 0 and isinstance(fused[-1], Map) and \
+                    fused[-1].workers is None:
+                previous = fused[-1]
+                operations = []
+                for operation in (previous.operation, node.operation):
+                    if isinstance(operation, _FusedOperation):
+                        operations.extend(operation.operations)
+                    else:
+                        operations.append(operation)
+                previous.operation = _FusedOperation(operations)
+            else:
+                fused.append(node)
+
+        plan = self.nodes[:shared] + fused
+        for previous, node in zip(plan[shared - 1:], plan[shared:]):
+            node.input = previous
+            previous.output = node
+
+        ordering = []
+        for node in plan:
+            ordering = list(node._output_ordering(ordering))
+            node.ordering = ordering
+        return plan
+
+    @staticmethod
+    def _can_push_down(node, input_node):
+        """ :return: True if node can be computed before input_node. """
+        if isinstance(node, Filter):
+            if isinstance(input_node, Sort):
+                return True
+            if isinstance(input_node, Project):
+                return node.columns is not None and \
+                    set(node.columns) <= set(input_node.columns)
+            if isinstance(input_node, Join):
+                return node.columns is not None and \
+                    input_node.strategy in ("inner", "right") and \
+                    set(node.columns) <= set(input_node.key)
+
+        if isinstance(node, Project) and isinstance(input_node, Sort):
+            return set(input_node.by) <= set(node.columns)
+
+        return False
+
+    def explain(self, analyze=False, file=None, **kwargs):
+        """
+        Print plans of dependency graphs (in order of computation) and of
+        this graph. Every node is printed with estimated number of rows
+        and cost, estimates are computed from sizes of inputs and from
+        the first input rows (see Node._estimate). Written plan is printed
+        too for graphs with optimize=True.
+
+        :param analyze: if True then graph is computed with profile=True
+        (result is not kept) and every node is printed with actual number
+        of rows, selectivity, self time and peak memory.
+        :param file: file object, sys.stdout by default.
+        :param kwargs: arguments of run (inputs, input_file, engine, ...)
+        which are used if analyze is True.
+        """
+        file = file or sys.stdout
+        if analyze:
+            kwargs.setdefault("output_file", os.devnull)
+            self.run(profile=True, **kwargs)
+
+        # estimates and samples of results of graphs.
+        estimates = {}
+        samples = {}
+        for graph in self.order + [self]:
+            title = graph.name or "graph {}".format(id(graph))
+            if graph.plan is not graph.nodes:
+                print("Plan of {}:".format(title), file=file)
+                for node in graph.nodes:
+                    print("    " + _describe(node), file=file)
+                title = "Optimized plan of " + title
+            else:
+                title = "Plan of " + title
+            print(title + ":", file=file)
+
+            rows, sample = None, None
+            if graph.input_node.input_graph is not None:
+                sample = samples.get(graph.input_node.input_graph)
+            for node in graph.plan:
+                rows, cost, sample = node._estimate(rows, sample, estimates)
+                print("    {}  (rows={}, cost={})".format(
+                    _describe(node), "?" if rows is None else rows,
+                    "?" if cost is None else cost), file=file)
+
+                metrics = graph.metrics.get(node) if analyze else None
+                if metrics is not None:
+                    selectivity = metrics.rows_out / metrics.rows_in \
+                        if metrics.rows_in > 0 else 0.0
+                    print("        actual rows={}, selectivity={:.3f}, "
+                          "self time={:.6f}s, peak memory={} bytes".format(
+                              metrics.rows_out, selectivity,
+                              metrics.self_time, metrics.peak_memory),
+                          file=file)
+            estimates[graph] = rows
+            samples[graph] = sample
+
+    def _propagate_ordering(self):
+        """
+        Compute ordering of output of every node from input to output.
+        Sort nodes whose keys are a prefix of ordering of their input
+        become pass-through.
+        """
+        ordering = []
+        for node in self.nodes:
+            ordering = list(node._output_ordering(ordering))
+            node.ordering = ordering
+
     def _topological_sort(self):
         """ Make graph topological sort for oprimize calculations. """
 
@@ -517,7 +3386,9 @@ class Graph(object):
             if not graph._used:
                 self._depth_first_search(graph)
 
-        for graph in self._dependencies:
+        # Flags of all visited graphs are reset, otherwise transitive
+        # dependencies are skipped by the next sort.
+        for graph in self.order:
             graph._used = False
 
     def _depth_first_search(self, graph):
@@ -529,18 +3400,209 @@ class Graph(object):
 
         self.order.append(graph)
 
+    def _compute_dependencies(self, verbose, engine, workers, cache=None,
+                              release=False, pin=(), spill_dir=None,
+                              profile=False):
+        """
+        Compute results of dependency graphs from self.order.
+
+        If workers is None then graphs are computed one by one in
+        topological order. Otherwise every graph is submitted to thread pool
+        as soon as all its own dependencies are computed, so independent
+        graphs are computed concurrently.
+
+        self.timings is a dict {graph: (start, finish)} with times in
+        seconds since the beginning of computation.
+
+        If cache is not None then results are taken from cache when it is
+        possible and computed results are saved to cache.
+
+        If release is True then result of every dependency graph (except
+        graphs from pin) is dropped as soon as all graphs which use it are
+        computed. The last consumer is this graph, so its dependencies are
+        released by _finish_consumer after computing of this graph.
+
+        If spill_dir is not None then computed results are written to
+        files in this directory and read back by consumers through mmap.
+        """
+        self.timings = {}
+        start_time = time.perf_counter()
+
+        self._release_lock = threading.Lock()
+        self._retained = {}
+        self.peak_retained_bytes = 0
+        self._consumers = None
+        if release:
+            self._consumers = {graph: 0 for graph in self.order}
+            for graph in self.order + [self]:
+                for dependency in self._consumed(graph):
+                    if dependency in self._consumers:
+                        self._consumers[dependency] += 1
+
+        def compute(graph):
+            start = time.perf_counter() - start_time
+            if verbose:
+                print("Started {} at {:.3f}s\n".format(graph.name, start))
+
+            path = None
+            if spill_dir is not None:
+                path = os.path.join(spill_dir, "{}_{}.rows".format(
+                    graph.name or "graph", id(graph)))
+            graph.res = graph.run(verbose=verbose, engine=engine,
+                                  cache=cache, profile=profile,
+                                  _dependency=True, _spill_path=path)
+
+            finish = time.perf_counter() - start_time
+            self.timings[graph] = (start, finish)
+            if verbose:
+                print("Finished {} at {:.3f}s\n".format(graph.name, finish))
+
+            self._finish_consumer(graph, pin, verbose)
+
+        pending = [graph for graph in self.order if graph.res is None]
+        computed = set(graph for graph in self.order if graph.res is not None)
+        if workers is None:
+            for graph in pending:
+                if graph in computed:
+                    continue
+
+                # Graphs which read branches of one Tee are computed
+                # together, so rows are not buffered for the whole pass.
+                group = [graph] + [
+                    other for other in pending
+                    if other is not graph and other not in computed and
+                    len(_tees(graph) & _tees(other)) > 0 and
+                    all(dependency in computed
+                        for dependency in other._dependencies)]
+                if len(group) == 1:
+                    compute(graph)
+                else:
+                    with concurrent.futures.ThreadPoolExecutor(
+                            len(group)) as executor:
+                        for future in [executor.submit(compute, other)
+                                       for other in group]:
+                            future.result()
+                computed.update(group)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            running = {}
+            while len(pending) > 0 or len(running) > 0:
+                for graph in list(pending):
+                    if all(dependency in computed
+                           for dependency in graph._dependencies):
+                        running[executor.submit(compute, graph)] = graph
+                        pending.remove(graph)
+
+                if len(running) == 0:
+                    raise RuntimeError("Dependencies of {} can not be "
+                                       "computed: {}\n".format(
+                                           self.name, pending))
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    computed.add(running.pop(future))
+
+    def _consumed(self, graph):
+        """
+        :return: graphs whose results are used by computing of graph.
+        Dependency graph checks results of its whole order (and computes
+        missing ones), so they are kept until it is computed.
+        """
+        return graph._dependencies if graph is self else graph.order
+
+    def _finish_consumer(self, graph, pin, verbose):
+        """
+        Called when graph is computed. Track memory which is taken by
+        results of dependencies (only in verbose mode) and release results
+        which are not needed anymore.
+        """
+        with self._release_lock:
+            if verbose and graph is not self:
+                self._retained[graph] = _result_size(graph.res)
+                self.peak_retained_bytes = max(self.peak_retained_bytes,
+                                               sum(self._retained.values()))
+
+            if self._consumers is None:
+                return
+
+            for dependency in self._consumed(graph):
+                if dependency not in self._consumers:
+                    continue
+                self._consumers[dependency] -= 1
+                if self._consumers[dependency] == 0 and dependency not in pin:
+                    if isinstance(dependency.res, SpilledResult):
+                        dependency.res.remove()
+                    dependency.res = None
+                    self._retained.pop(dependency, None)
+                    if verbose:
+                        print("Released result of {}\n".format(
+                            dependency.name))
+
     def run(self, inputs=None, input_file=None,
-            output_file=None, verbose=False):
+            output_file=None, verbose=False, engine="row", workers=None,
+            cache=None, release=False, pin=(), spill_dir=None, shards=None,
+            shard_by=None, output_buffer_size=1 << 20, profile=False,
+            state_file=None, _dependency=False, _spill_path=None):
         """
         :param inputs: dictionary {graph: path_to_input_file}.
         :param input_file: path to input file (only if inputs is None).
-        :param output_file: file object in which result will be written.
+        :param output_file: file object or path to file in which result
+        will be written. Rows are written as soon as they are computed,
+        result is not kept in memory (unless cache is used). Files with
+        .gz, .bz2 and .xz extensions are compressed.
         :param verbose: verbose flag.
-        :return: list with dicts which is a result of computing.
+        :param engine: "row", "batch" or "columnar". Row engine passes one
+        dict per row between nodes. Batch engine passes lists of
+        self.batch_size dicts. Columnar engine passes batches of numpy
+        arrays (numpy is required). All engines give the same result.
+        :param workers: maximal number of dependency graphs which are
+        computed concurrently. None means computing one by one.
+        :param cache: ResultCache object. If it is not None then results of
+        this graph and its dependencies are taken from cache when they are
+        up to date and saved to cache otherwise.
+        :param release: if True then results of dependency graphs are
+        dropped as soon as the last graph which uses them is computed.
+        :param pin: graphs whose results are never released.
+        :param spill_dir: path to directory. If it is not None then results
+        of dependency graphs are stored in files in this directory instead
+        of lists of dicts in memory.
+        :param shards: number of files to which result is written. Then
+        output_file is a path with "{}" placeholder for number of shard.
+        :param shard_by: string or list of columns. Rows with equal values
+        of these columns are written to one shard.
+        :param output_buffer_size: size of write buffer of output files.
+        :param profile: if True then metrics of nodes of this graph and
+        its dependencies are collected (see report).
+        :param state_file: path to file with state of incremental
+        computation. Then only lines appended to input_file since the
+        previous run are read, per-key state of Reduce, GroupBy or Fold
+        is updated by them and result has only updated rows of affected
+        keys. If input_file was changed in other way (or there is no
+        state yet) then everything is computed from the beginning.
+        Incremental Reduce keeps all input rows in the state, prefer
+        GroupBy with aggregations for large inputs.
+        :param _dependency: True if this graph is computed as a dependency
+        of other graph (internal), then result taken from cache is
+        returned as CachedResult which streams rows from disk.
+        :param _spill_path: path to file (internal). If it is not None then
+        computed rows are streamed to this file and SpilledResult is
+        returned, so result is never kept in memory.
+        :return: list with dicts which is a result of computing
+        (None if output_file is passed).
         """
+        if engine not in ("row", "batch", "columnar"):
+            raise ValueError("Unknown engine {}\n".format(engine))
+        if engine == "columnar" and numpy is None:
+            raise ImportError("Columnar engine requires numpy")
+
         if verbose:
             print("Computing in {}\n".format(self.name))
-        res = []
+            for node in self.nodes:
+                if isinstance(node, Sort) and node.elided:
+                    print("{} is elided, input is sorted by {}\n".format(
+                        node, node.input.ordering))
 
         if inputs is not None:
             for graph, file in inputs.items():
@@ -552,15 +3614,213 @@ class Graph(object):
         elif input_file is not None:
             self.input_node.input_file = input_file
 
-        for graph in self.order:
-            if graph.res is None:
-                graph.res = graph.run(verbose=verbose)
+        if state_file is not None:
+            if cache is not None:
+                raise ValueError("Incremental computation can not be "
+                                 "cached\n")
+            stateful = self._incremental_nodes(engine)
 
-        for i in self.nodes[-1].run():
-            res.append(i)
+        cached = cache.get(self) if cache is not None else None
+        if cached is not None:
+            if verbose:
+                print("Result of {} is taken from cache\n".format(self.name))
+            res = cached if output_file is not None or _dependency \
+                else list(cached)
 
-        if output_file is not None:
-            for line in res:
-                output_file.write(json.dumps(line) + "\n")
         else:
+            self._compute_dependencies(verbose, engine, workers, cache,
+                                       release, pin, spill_dir, profile)
+            if profile:
+                self._start_profile()
+
+        # Nodes are restored even if computing fails.
+        try:
+            if state_file is not None:
+                self._start_increment(state_file, stateful)
+
+            if cached is None:
+                # Result is collected only if it is returned or cached,
+                # otherwise rows are streamed to output_file.
+                res = self._rows(engine)
+                if _spill_path is not None:
+                    res = SpilledResult.write(_spill_path, res)
+                elif output_file is None or cache is not None:
+                    res = list(res)
+
+            if output_file is not None:
+                _write_rows(res, output_file, output_buffer_size, shards,
+                            shard_by)
+
+            if state_file is not None:
+                self._save_increment(state_file)
+        finally:
+            if cached is None and profile:
+                self._finish_profile()
+            if state_file is not None:
+                self._stop_increment()
+
+        if cached is None:
+            self._finish_consumer(self, pin, verbose)
+            if verbose and len(self.order) > 0:
+                print("Peak retained bytes of dependencies: {}\n".format(
+                    self.peak_retained_bytes))
+
+            if cache is not None:
+                cache.put(self, res)
+
+        if output_file is None:
             return res
+
+    def _incremental_nodes(self, engine):
+        """
+        Check that this graph can be computed incrementally.
+        :return: stateful node of plan (Reduce, GroupBy or Fold) or None.
+        """
+        if engine != "row":
+            raise ValueError("Incremental computation supports only row "
+                             "engine\n")
+        if len(self._dependencies) > 0:
+            raise ValueError("Incremental computation of {} is impossible: "
+                             "it has dependencies\n".format(self.name))
+        if self.input_node.input_file is None:
+            raise ValueError("Incremental computation requires "
+                             "input_file\n")
+        self.input_node._splittable_file()
+
+        stateful = [node for node in self.plan
+                    if isinstance(node, (Reduce, GroupBy, Fold))]
+        others = [node for node in self.plan
+                  if not isinstance(node, (Input, Map, Filter, Project, Sort,
+                                           Reduce, GroupBy, Fold))]
+        if len(others) > 0 or len(stateful) > 1 or (
+                len(stateful) == 1 and stateful[0] is not self.plan[-1]):
+            raise ValueError("Incremental computation of {} is impossible: "
+                             "only Map, Filter, Project and Sort nodes and "
+                             "one Reduce, GroupBy or Fold node at the end "
+                             "are supported\n".format(self.name))
+        return stateful[0] if len(stateful) > 0 else None
+
+    def _start_increment(self, state_file, stateful):
+        """
+        Load state of incremental computation from state_file and pass it
+        to nodes. The state is dropped if input_file was not only appended
+        or nodes (their operations, keys, aggregators) were changed.
+        :param stateful: stateful node of plan (see _incremental_nodes).
+        """
+        path = os.path.abspath(self.input_node.input_file)
+        nodes = self._increment_fingerprint()
+
+        try:
+            with open(state_file, "rb") as file:
+                saved = pickle.load(file)
+        except FileNotFoundError:
+            saved = None
+
+        if saved is None or saved["input_file"] != path or \
+                saved["nodes"] != nodes or \
+                _tail_digest(path, saved["offset"]) != saved["tail"]:
+            saved = {"offset": 0, "state": {}}
+
+        self.input_node.offset = saved["offset"]
+        if stateful is not None:
+            stateful.increment = saved["state"]
+
+    def _increment_fingerprint(self):
+        """
+        :return: hex string which identifies nodes of plan and their
+        parameters (input file is checked separately).
+        """
+        digest = hashlib.sha256()
+        for node in self.plan:
+            digest.update(type(node).__name__.encode())
+            if not isinstance(node, Input):
+                _update_digest(digest, node._parameters())
+        return digest.hexdigest()
+
+    def _save_increment(self, state_file):
+        """ Save state of incremental computation to state_file. """
+        stateful = [node for node in self.plan
+                    if isinstance(node, (Reduce, GroupBy, Fold))]
+        path = os.path.abspath(self.input_node.input_file)
+        offset = self.input_node.offset
+        state = {"input_file": path,
+                 "nodes": self._increment_fingerprint(),
+                 "offset": offset, "tail": _tail_digest(path, offset),
+                 "state": stateful[0].increment if len(stateful) > 0
+                 else {}}
+
+        directory = os.path.dirname(os.path.abspath(state_file))
+        file = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        with file:
+            pickle.dump(state, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(file.name, state_file)
+
+    def _stop_increment(self):
+        """
+        Return nodes to ordinary computation (also when incremental
+        computation fails, then state_file is not changed).
+        """
+        self.input_node.offset = None
+        for node in self.plan:
+            if isinstance(node, (Reduce, GroupBy, Fold)):
+                node.increment = None
+
+    def _start_profile(self):
+        """ Wrap methods of nodes of plan to collect their metrics. """
+        self.metrics = {node: _profiled_nodes.acquire(node)
+                        for node in self.plan}
+
+    def _finish_profile(self):
+        """ Restore methods of nodes and compute derived metrics. """
+        for node in self.plan:
+            if not _profiled_nodes.release(node):
+                # Node is shared with other graph which is still computed,
+                # its metrics are finished by that graph.
+                continue
+
+            # Branch reads rows of input of Tee directly.
+            source = node.input.input if isinstance(node, Branch) \
+                else node.input
+            metrics = self.metrics[node]
+            if isinstance(node, Input) or source not in self.metrics:
+                metrics.rows_in = metrics.rows_out
+            else:
+                upstream = self.metrics[source]
+                if isinstance(node, Tee):
+                    # Rows of Tee are read by branches from its input.
+                    metrics.rows_out = upstream.rows_out
+                    metrics.total_time = upstream.total_time
+                metrics.rows_in = upstream.rows_out
+                metrics.wait_time = upstream.total_time
+            if isinstance(node, Branch):
+                metrics.rows_in = metrics.rows_out
+            if isinstance(node, Join) and node.graph.res is not None:
+                metrics.rows_in += len(node.graph.res)
+            metrics.self_time = metrics.total_time - metrics.wait_time
+
+    def report(self):
+        """
+        :return: list of dicts with metrics of nodes of dependency graphs
+        and this graph from the last computation with profile=True.
+        Every dict has also "graph" (name of graph) and "node"
+        (description of node) keys.
+        """
+        report = []
+        for graph in self.order + [self]:
+            for node in graph.plan:
+                if node in graph.metrics:
+                    row = {"graph": graph.name, "node": _describe(node)}
+                    row.update(graph.metrics[node].as_dict())
+                    report.append(row)
+        return report
+
+    def _rows(self, engine):
+        """ Yield rows of result of this graph computed by engine. """
+        if engine == "columnar":
+            for batch in self.plan[-1].run_columns():
+                yield from _columns_to_rows(batch)
+        elif engine == "batch":
+            for batch in self.plan[-1].run_batches(self.batch_size):
+                yield from batch
+        else:
+            yield from self.plan[-1].run()
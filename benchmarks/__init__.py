@@ -0,0 +1,8 @@
+"""
+Benchmarks of example pipelines and of single operations of Graph.
+
+Run from the root of repository:
+
+    python -m benchmarks.run --scales small medium --output results.json
+    python -m benchmarks.run --baseline results.json
+"""
@@ -0,0 +1,78 @@
+import bisect
+import itertools
+import json
+import random
+import string
+
+
+def make_vocabulary(size, seed=0):
+    """
+    :param size: number of words.
+    :param seed: seed of random generator.
+    :return: list of distinct words of letters (3 to 10 letters long).
+    """
+    generator = random.Random(seed)
+    words = []
+    seen = set()
+    while len(words) < size:
+        length = generator.randint(3, 10)
+        word = "".join(generator.choice(string.ascii_lowercase)
+                       for _ in range(length))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def zipf_sampler(size, skew, generator):
+    """
+    :param size: number of ranks.
+    :param skew: exponent of Zipf distribution, rank r has weight 1 / r^skew.
+    :param generator: random.Random object.
+    :return: function which returns random rank from 0 to size - 1.
+    """
+    weights = itertools.accumulate(1 / rank ** skew
+                                   for rank in range(1, size + 1))
+    cumulative = list(weights)
+    total = cumulative[-1]
+
+    def sample():
+        return bisect.bisect(cumulative, generator.random() * total)
+
+    return sample
+
+
+def generate_corpus(path, docs=1000, vocabulary=10000, words_per_doc=100,
+                    skew=1.1, seed=0):
+    """
+    Write deterministic JSON-lines corpus of documents
+    {"doc_id": number, "text": words}. Words are drawn from vocabulary
+    by Zipf distribution, lengths of documents are uniform between
+    words_per_doc / 2 and 3 * words_per_doc / 2.
+    :return: number of bytes of corpus.
+    """
+    generator = random.Random(seed)
+    words = make_vocabulary(vocabulary, seed)
+    sample = zipf_sampler(vocabulary, skew, generator)
+
+    size = 0
+    with open(path, "w") as file:
+        for doc_id in range(docs):
+            length = generator.randint(words_per_doc // 2,
+                                       3 * words_per_doc // 2)
+            text = " ".join(words[sample()] for _ in range(length))
+            line = json.dumps({"doc_id": doc_id, "text": text}) + "\n"
+            file.write(line)
+            size += len(line)
+    return size
+
+
+def generate_rows(count, keys=1000, skew=1.1, seed=0):
+    """
+    :return: list of rows {"key": number, "value": number, "weight": float}
+    with keys drawn by Zipf distribution.
+    """
+    generator = random.Random(seed)
+    sample = zipf_sampler(keys, skew, generator)
+    return [{"key": sample(), "value": index, "weight": generator.random()}
+            for index in range(count)]
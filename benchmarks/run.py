@@ -0,0 +1,255 @@
+""" Run benchmarks and compare their results with saved baseline. """
+
+import argparse
+import concurrent.futures
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from Graph import Graph, Input, Sort, Join, Reduce, Fold  # noqa: E402
+from benchmarks.corpus import generate_corpus, generate_rows  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Parameters of every scale: number of documents of corpus for pipelines
+# and number of rows for operations.
+SCALES = {
+    "small": {"docs": 200, "rows": 20000},
+    "medium": {"docs": 2000, "rows": 200000},
+    "large": {"docs": 20000, "rows": 2000000},
+}
+
+JOIN_STRATEGIES = ["inner", "left", "right", "outer"]
+JOIN_METHODS = ["sort", "hash", "merge"]
+
+
+def load_example(name):
+    """ :return: module of examples/<name>.py. """
+    path = os.path.join(ROOT, "examples", name + ".py")
+    spec = importlib.util.spec_from_file_location(
+        "example_" + name.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_word_count(path):
+    graph = load_example("word_count").build_graph()
+    graph.run(input_file=path, output_file=os.devnull)
+
+
+def run_tf_idf(path):
+    calc_index, split_words = load_example("tf-idf").build_graph()
+    calc_index.run(inputs={split_words: path}, output_file=os.devnull)
+
+
+def run_pmi(path):
+    graph = load_example("pmi").build_graph()
+    graph.run(input_file=path, output_file=os.devnull)
+
+
+PIPELINES = {
+    "word_count": run_word_count,
+    "tf-idf": run_tf_idf,
+    "pmi": run_pmi,
+}
+
+
+def sum_values(rows):
+    yield {"key": rows[0]["key"], "value": sum(row["value"] for row in rows)}
+
+
+def add_weight(state, row):
+    state["weight"] += row["weight"]
+    return state
+
+
+def build_operation(name, rows):
+    """
+    :param name: name of operation: sort, reduce, fold or
+    join/<strategy>/<method>.
+    :param rows: input rows.
+    :return: Graph object which computes operation.
+    """
+    input_node = Input(input=rows)
+    if name == "sort":
+        output_node = Sort("key")(input_node)
+    elif name == "reduce":
+        output_node = Reduce(sum_values, "key")(Sort("key")(input_node))
+    elif name == "fold":
+        output_node = Fold(add_weight, {"weight": 0.0})(input_node)
+    else:
+        _, strategy, method = name.split("/")
+        keys = sorted(set(row["key"] for row in rows))
+        right_input = Input(input=[{"key": key, "name": str(key)}
+                                   for key in keys[::2]])
+        right_node = right_input
+        left_node = input_node
+        if method == "merge":
+            # Merge join expects both tables sorted by key.
+            right_node = Sort("key")(right_input)
+            left_node = Sort("key")(input_node)
+        right_graph = Graph(input_node=right_input, output_node=right_node)
+        right_graph.run()
+        output_node = Join(right_graph, "key", strategy,
+                           method=method)(left_node)
+
+    return Graph(input_node=input_node, output_node=output_node)
+
+
+def operations():
+    names = ["sort", "reduce", "fold"]
+    for strategy in JOIN_STRATEGIES:
+        for method in JOIN_METHODS:
+            names.append("join/{}/{}".format(strategy, method))
+    return names
+
+
+def peak_rss():
+    """ :return: peak resident set size of this process in bytes. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(kind, name, scale, corpus):
+    """
+    Run one benchmark. It is called in a fresh process, so peak RSS
+    belongs to this benchmark only.
+    :param kind: "pipeline" or "operation".
+    :param name: name of pipeline or operation.
+    :param scale: name of scale.
+    :param corpus: path to corpus of this scale.
+    :return: dict with seconds, number of input rows and peak RSS.
+    """
+    if kind == "pipeline":
+        rows = SCALES[scale]["docs"]
+        start = time.perf_counter()
+        PIPELINES[name](corpus)
+    else:
+        data = generate_rows(SCALES[scale]["rows"])
+        rows = len(data)
+        graph = build_operation(name, data)
+        start = time.perf_counter()
+        graph.run()
+
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rows": rows,
+            "rows_per_second": rows / seconds, "peak_rss": peak_rss()}
+
+
+def run_benchmarks(scales, only=None, repeat=1, directory=None):
+    """
+    :param scales: list of names of scales.
+    :param only: substring of names of benchmarks which are run.
+    :param repeat: number of runs of every benchmark, the fastest is kept.
+    :param directory: directory for corpora (temporary by default).
+    :return: dict with results.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    with tempfile.TemporaryDirectory(dir=directory) as corpora:
+        for scale in scales:
+            corpus = os.path.join(corpora, scale + ".txt")
+            generate_corpus(corpus, docs=SCALES[scale]["docs"])
+
+            benchmarks = [("pipeline", name) for name in PIPELINES] + \
+                [("operation", name) for name in operations()]
+            for kind, name in benchmarks:
+                key = "{}/{}/{}".format(kind, name, scale)
+                if only is not None and only not in key:
+                    continue
+
+                best = None
+                for _ in range(repeat):
+                    with concurrent.futures.ProcessPoolExecutor(
+                            1, mp_context=context) as executor:
+                        result = executor.submit(measure, kind, name, scale,
+                                                 corpus).result()
+                    if best is None or result["seconds"] < best["seconds"]:
+                        best = result
+
+                results[key] = best
+                print("{:40} {:10.3f}s {:14.0f} rows/s".format(
+                    key, best["seconds"], best["rows_per_second"]))
+
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "benchmarks": results}
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    :param results: results of run_benchmarks.
+    :param baseline: saved results of run_benchmarks.
+    :param threshold: allowed relative drop of throughput and growth
+    of peak RSS.
+    :return: list of messages about regressions.
+    """
+    regressions = []
+    for key, result in sorted(results["benchmarks"].items()):
+        old = baseline["benchmarks"].get(key)
+        if old is None:
+            continue
+
+        ratio = result["rows_per_second"] / old["rows_per_second"]
+        if ratio < 1 - threshold:
+            regressions.append("{}: throughput {:.0f} -> {:.0f} rows/s "
+                               "({:+.1%})".format(key, old["rows_per_second"],
+                                                  result["rows_per_second"],
+                                                  ratio - 1))
+
+        if old["peak_rss"] and result["peak_rss"]:
+            ratio = result["peak_rss"] / old["peak_rss"]
+            if ratio > 1 + threshold:
+                regressions.append("{}: peak RSS {} -> {} bytes "
+                                   "({:+.1%})".format(key, old["peak_rss"],
+                                                      result["peak_rss"],
+                                                      ratio - 1))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", nargs="+", default=["small"],
+                        choices=sorted(SCALES))
+    parser.add_argument("--only", help="run benchmarks whose names "
+                                       "contain this string")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="saved results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    arguments = parser.parse_args(arguments)
+
+    results = run_benchmarks(arguments.scales, arguments.only,
+                             arguments.repeat)
+    with open(arguments.output, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, arguments.threshold)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 import math
 import re
-from Graph import Graph, Input, Reduce, Map, Sort
+from Graph import Graph, Input, Reduce, Map, Sort, TopK
 
 
 def docs_count(rows):
@@ -65,24 +65,23 @@ def count_words(rows):
         yield row
 
 
-def count_pmi(rows):
-    """ Calculate PMI and yield result. """
-    words = []
-    for row in rows:
-        pmi = math.log(row['number_in_doc'] * row['words_in_total']
-                       / row['sum_of_docs'] / row['words_in_doc'])
+def count_pmi(row):
+    """ Calculate PMI of word in document. """
+    row['pmi'] = math.log(row['number_in_doc'] * row['words_in_total']
+                          / row['sum_of_docs'] / row['words_in_doc'])
+    yield row
 
-        words.append((row['word'], pmi))
 
-    words.sort(key=lambda x: x[1], reverse=True)
+def top_words(rows):
+    """ Yield result from top words of document. """
     yield {
         'doc_id': rows[0]['doc_id'],
-        'top_words': words[:10]
+        'top_words': [(row['word'], row['pmi']) for row in rows]
     }
 
 
-if __name__ == "__main__":
-
+def build_graph():
+    """ :return: Graph object which finds top pmi words of documents. """
     input_node = Input()
     docs_count_reducer = Reduce(docs_count)(input_node)
     split_mapper = Map(split_text, "tokenizer")(docs_count_reducer)
@@ -100,9 +99,15 @@ if __name__ == "__main__":
                                      key="doc_id")(sort_by_doc_id)
 
     words_reducer = Reduce(count_words)(word_in_one_doc_reducer)
-    pmi_reducer = Reduce(count_pmi, "doc_id")(words_reducer)
+    pmi_mapper = Map(count_pmi)(words_reducer)
+    top_pmi = TopK(10, "pmi", key="doc_id", reverse=True)(pmi_mapper)
+    pmi_reducer = Reduce(top_words, "doc_id")(top_pmi)
 
-    count_pmi = Graph(input_node=input_node, output_node=pmi_reducer)
+    return Graph(input_node=input_node, output_node=pmi_reducer)
+
+
+if __name__ == "__main__":
 
-    res = count_pmi.run(input_file="data/text_corpus.txt",
+    pmi_graph = build_graph()
+    res = pmi_graph.run(input_file="data/text_corpus.txt",
                         output_file=open("pmi.txt", "w"))
\ No newline at end of file
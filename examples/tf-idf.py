@@ -1,8 +1,7 @@
 from collections import Counter
-from operator import itemgetter
 import math
 import re
-from Graph import Graph, Input, Join, Fold, Reduce, Map, Sort
+from Graph import Graph, Input, Join, Fold, Reduce, Map, Sort, Tee, TopK
 
 
 def split_text(record):
@@ -59,31 +58,35 @@ def term_frequency_reducer(records):
         }
 
 
-def invert_index(records):
-    """ Calculate final result. """
-    for row in records:
-        row["tf_idf"] = row["tf"] * \
-                        math.log(row['docs_count'] / row['count_idf'])
+def calc_tf_idf(record):
+    """ Calculate tf-idf of word in document. """
+    record["tf_idf"] = record["tf"] * \
+                       math.log(record['docs_count'] / record['count_idf'])
+    yield record
 
-    records = sorted(records, key = itemgetter("tf_idf"), reverse=True)
 
+def invert_index(records):
+    """ Calculate final result from top documents of word. """
     yield {
-        "word": row["word"],
-        "index": [(records[i]["doc_id"], records[i]["tf_idf"])
-                  for i in range(0, min(3, len(records)))]
+        "word": records[0]["word"],
+        "index": [(row["doc_id"], row["tf_idf"]) for row in records]
     }
 
 
-if __name__ == "__main__":
-
-    split_input_node = Input()
-    split_mapper = Map(split_text)(split_input_node)
-    split_words = Graph(input_node=split_input_node, output_node=split_mapper,
+def build_graph():
+    """
+    :return: tuple (calc_index, split_words) of Graph objects. calc_index
+    computes index, split_words reads corpus.
+    """
+    corpus_input = Input()
+    corpus_tee = Tee()(corpus_input)
+    split_mapper = Map(split_text)(corpus_tee.branch())
+    split_words = Graph(input_node=corpus_input, output_node=split_mapper,
                         name="split_words")
 
-    fold_input = Input()
-    folder = Fold(docs_count, {"docs_count": 0}, "doc_number")(fold_input)
-    count_docs = Graph(input_node=fold_input, output_node=folder)
+    folder = Fold(docs_count, {"docs_count": 0},
+                  "doc_number")(corpus_tee.branch())
+    count_docs = Graph(input_node=corpus_input, output_node=folder)
 
     count_idf_input = Input(split_words)
     sort_node = Sort(["doc_id", "word"])(count_idf_input)
@@ -98,12 +101,19 @@ if __name__ == "__main__":
     sort_doc = Sort("doc_id")(calc_index_input)
     tf_reducer = Reduce(term_frequency_reducer, "doc_id")(sort_doc)
     join_left = Join(count_idf, "word", "left")(tf_reducer)
-    invert_reduce = Reduce(invert_index, "word")(join_left)
+    tf_idf_mapper = Map(calc_tf_idf)(join_left)
+    top_docs = TopK(3, "tf_idf", key="word", reverse=True)(tf_idf_mapper)
+    invert_reduce = Reduce(invert_index, "word")(top_docs)
     calc_index = Graph(input_node=calc_index_input, output_node=invert_reduce)
 
+    return calc_index, split_words
+
+
+if __name__ == "__main__":
+
+    calc_index, split_words = build_graph()
     dependencies = {
         split_words: "data/text_corpus.txt",
-        count_docs: "data/text_corpus.txt",
     }
 
     res = calc_index.run(inputs=dependencies,
@@ -1,5 +1,5 @@
 import re
-from Graph import Graph, Input, Reduce, Map, Sort
+from Graph import Graph, Input, Map, Sort, GroupBy, Count
 
 
 def split_text(record):
@@ -16,21 +16,20 @@ def split_text(record):
         }
 
 
-def word_counter(rows):
-    """ Count words. """
-    yield {
-        'word' : rows[0]['word'],
-        'number' : len(rows)
-    }
+def build_graph():
+    """ :return: Graph object which counts words of corpus. """
+    input_node = Input()
+    mapper = Map(split_text)(input_node)
+    counter = GroupBy(key="word", aggregations={"number": Count()})(mapper)
+    # GroupBy yields words in order of first occurrence, result is
+    # sorted by word.
+    sorter = Sort("word")(counter)
 
+    return Graph(input_node=input_node, output_node=sorter)
 
-if __name__ == "__main__":
 
-    input_node = Input()
-    mapper = Map(split_text)(input_node)
-    sort = Sort("word")(mapper)
-    reduce = Reduce(word_counter, "word")(sort)
+if __name__ == "__main__":
 
-    graph = Graph(input_node=input_node, output_node=reduce)
+    graph = build_graph()
     graph.run(input_file="data/text_corpus.txt",
               output_file=open("word_count.txt", "w"))
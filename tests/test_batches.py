@@ -0,0 +1,72 @@
+import pytest
+from Graph import Input, Map, Sort, Reduce, Fold, Join, TopK, Graph
+
+
+@pytest.fixture
+def get_persons():
+    return [
+        {"name": "Andrey", "id": 1, "age": 38},
+        {"name": "Leonid", "id": 2, "age": 20},
+        {"name": "Sergey", "id": 1, "age": 25},
+        {"name": "Grigoroy", "id": 4, "age": 64},
+        {"name": "Misha", "id": 1, "age": 5},
+        {"name": "Roma", "id": 1, "age": 25},
+        {"name": "Rishat", "id": 2, "age": 17},
+        {"name": "Maxim", "id": 5, "age": 28},
+        {"name": "Stepan", "id": 10, "age": 14},
+    ]
+
+
+def split_name(row):
+    for letter in row["name"][:2]:
+        yield {"id": row["id"], "letter": letter, "age": row["age"]}
+
+
+def count_letters(rows):
+    yield {"id": rows[0]["id"], "count": len(rows)}
+
+
+def add_age(state, row):
+    state["age"] += row["age"]
+    return state
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 5, 1024])
+def test_batch_engine_pipeline(get_persons, batch_size):
+    input_node = Input(input=get_persons)
+    map_node = Map(split_name)(input_node)
+    sort_node = Sort("id")(map_node)
+    reduce_node = Reduce(count_letters, "id")(sort_node)
+    graph = Graph(input_node=input_node, output_node=reduce_node,
+                  batch_size=batch_size)
+
+    assert graph.run(engine="batch") == graph.run()
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1024])
+def test_batch_engine_join_and_top(get_persons, batch_size):
+    ids = [{"id": 1, "city": "Moscow"}, {"id": 2, "city": "Kazan"}]
+    ids_input = Input(input=ids)
+    ids_graph = Graph(input_node=ids_input, output_node=ids_input)
+
+    input_node = Input(input=get_persons)
+    join_node = Join(ids_graph, "id", "left")(input_node)
+    top_node = TopK(2, "age", key="id")(join_node)
+    graph = Graph(input_node=input_node, output_node=top_node,
+                  batch_size=batch_size)
+    ids_graph.run()
+
+    assert graph.run(engine="batch") == graph.run()
+
+
+def test_batch_engine_fold_and_file(get_persons, tmp_path):
+    path = tmp_path / "persons.txt"
+    path.write_text("\n".join('{{"age": {}}}'.format(row["age"])
+                              for row in get_persons) + "\n")
+
+    input_node = Input(input_file=str(path))
+    fold_node = Fold(add_age, {"age": 0})(input_node)
+    graph = Graph(input_node=input_node, output_node=fold_node, batch_size=4)
+
+    assert graph.run(engine="batch") == [{"age": 236}]
+    assert graph.run() == [{"age": 236}]
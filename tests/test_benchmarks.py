@@ -0,0 +1,42 @@
+import json
+from benchmarks.corpus import generate_corpus, generate_rows
+from benchmarks.run import build_operation, compare, operations
+
+
+def test_corpus_is_deterministic(tmp_path):
+    first = str(tmp_path / "first.txt")
+    second = str(tmp_path / "second.txt")
+    generate_corpus(first, docs=20, vocabulary=100, seed=3)
+    generate_corpus(second, docs=20, vocabulary=100, seed=3)
+
+    with open(first) as file:
+        text = file.read()
+    with open(second) as file:
+        assert file.read() == text
+
+    docs = [json.loads(line) for line in text.splitlines()]
+    assert [doc["doc_id"] for doc in docs] == list(range(20))
+    assert all(doc["text"].replace(" ", "").isalpha() for doc in docs)
+
+
+def test_operations_run():
+    rows = generate_rows(200, keys=20)
+    for name in operations():
+        assert len(build_operation(name, rows).run()) > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"benchmarks": {
+        "operation/sort/small": {"rows_per_second": 1000, "peak_rss": 100},
+        "operation/fold/small": {"rows_per_second": 1000, "peak_rss": 100},
+    }}
+    results = {"benchmarks": {
+        "operation/sort/small": {"rows_per_second": 800, "peak_rss": 100},
+        "operation/fold/small": {"rows_per_second": 950, "peak_rss": 150},
+        "operation/reduce/small": {"rows_per_second": 10, "peak_rss": 100},
+    }}
+
+    regressions = compare(results, baseline, threshold=0.1)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("operation/fold/small: peak RSS")
+    assert regressions[1].startswith("operation/sort/small: throughput")
@@ -0,0 +1,129 @@
+import json
+import os
+import pytest
+from Graph import Input, Map, Sort, Reduce, Graph, ResultCache, CachedResult
+
+
+@pytest.fixture
+def get_docs():
+    return [
+        {"doc_id": 1, "text": "hello world"},
+        {"doc_id": 2, "text": "hello again"},
+    ]
+
+
+calls = []
+
+
+def split_text(row):
+    calls.append(row["doc_id"])
+    for word in row["text"].split():
+        yield {"doc_id": row["doc_id"], "word": word}
+
+
+def word_counter(rows):
+    yield {"word": rows[0]["word"], "number": len(rows)}
+
+
+def build_graph(path):
+    split_input = Input(input_file=path)
+    split_mapper = Map(split_text)(split_input)
+    split_words = Graph(input_node=split_input, output_node=split_mapper,
+                        name="split_words")
+
+    count_input = Input(split_words)
+    sort = Sort("word")(count_input)
+    reduce = Reduce(word_counter, "word")(sort)
+    return Graph(input_node=count_input, output_node=reduce)
+
+
+def write_docs(path, docs):
+    with open(path, "w") as file:
+        for doc in docs:
+            file.write(json.dumps(doc) + "\n")
+
+
+def test_cache_hit(tmp_path, get_docs):
+    path = str(tmp_path / "docs.txt")
+    write_docs(path, get_docs)
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    del calls[:]
+    first = build_graph(path).run(cache=cache)
+    assert calls == [1, 2]
+    assert first == [{"word": "again", "number": 1},
+                     {"word": "hello", "number": 2},
+                     {"word": "world", "number": 1}]
+
+    del calls[:]
+    graph = build_graph(path)
+    assert graph.run(cache=cache) == first
+    assert calls == []
+
+    # Dependency is taken from cache when only the final graph is removed.
+    cache.invalidate(graph)
+    assert build_graph(path).run(cache=cache) == first
+    assert calls == []
+
+
+def test_cache_input_changed(tmp_path, get_docs):
+    path = str(tmp_path / "docs.txt")
+    write_docs(path, get_docs)
+    cache = ResultCache(str(tmp_path / "cache"), hash_content=True)
+    build_graph(path).run(cache=cache)
+
+    write_docs(path, get_docs[:1])
+    del calls[:]
+    res = build_graph(path).run(cache=cache)
+    assert calls == [1]
+    assert res == [{"word": "hello", "number": 1},
+                   {"word": "world", "number": 1}]
+
+
+def test_cache_eviction(tmp_path, get_docs):
+    path = str(tmp_path / "docs.txt")
+    write_docs(path, get_docs)
+    directory = str(tmp_path / "cache")
+    cache = ResultCache(directory, max_bytes=1)
+    build_graph(path).run(cache=cache)
+    assert os.listdir(directory) == []
+
+    cache = ResultCache(directory)
+    build_graph(path).run(cache=cache)
+    assert len(os.listdir(directory)) == 2
+    cache.clear()
+    assert os.listdir(directory) == []
+
+
+def make_filter(threshold):
+    def keep_long(row):
+        if len(row["word"]) > threshold:
+            yield row
+    return keep_long
+
+
+def test_cache_closure_changed(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    rows = [{"word": "a"}, {"word": "hello"}]
+
+    results = []
+    for threshold in (0, 3):
+        input_node = Input(input=rows)
+        map_node = Map(make_filter(threshold))(input_node)
+        graph = Graph(input_node=input_node, output_node=map_node)
+        results.append(graph.run(cache=cache))
+
+    assert results == [rows, rows[1:]]
+
+
+def test_cached_dependency_is_streamed(tmp_path, get_docs):
+    path = str(tmp_path / "docs.txt")
+    write_docs(path, get_docs)
+    cache = ResultCache(str(tmp_path / "cache"))
+    first = build_graph(path).run(cache=cache)
+
+    graph = build_graph(path)
+    cache.invalidate(graph)
+    assert graph.run(cache=cache) == first
+    assert isinstance(graph.order[0].res, CachedResult)
+    assert len(graph.order[0].res) == 4
@@ -0,0 +1,99 @@
+import copy
+import pytest
+from Graph import Input, Map, Sort, Reduce, Fold, Join, Graph
+
+numpy = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def get_advanced_persons():
+    return [
+        {"name": "Andrey", "id": 1, "age": 38},
+        {"name": "Leonid", "id": 2, "age": 20},
+        {"name": "Sergey", "id": 1, "age": 25},
+        {"name": "Grigoroy", "id": 4, "age": 64},
+        {"name": "Misha", "id": 1, "age": 5},
+        {"name": "Roma", "id": 1, "age": 10},
+        {"name": "Rishat", "id": 2, "age": 17},
+        {"name": "Maxim", "id": 5, "age": 28},
+        {"name": "Stepan", "id": 10, "age": 14},
+    ]
+
+
+@pytest.fixture
+def get_cities():
+    return [
+        {"id": 1, "name": "Mocsow"},
+        {"id": 2, "name": "SPb"},
+        {"id": 3, "name": "Kazan"},
+        {"id": 7, "name": "Novgorod"},
+        {"id": 10, "name": "Kaluga"},
+        {"id": 12, "name": "Tula"},
+    ]
+
+
+def split_name(row):
+    for letter in row["name"]:
+        yield {"id": row["id"], "letter": letter}
+
+
+def count_letters(rows):
+    yield {"id": rows[0]["id"], "letter": rows[0]["letter"],
+           "count": len(rows)}
+
+
+def sum_ages(state, record):
+    return {"age": state["age"] + record["age"]}
+
+
+def run_both_engines(graph):
+    row_res = graph.run()
+    columnar_res = graph.run(engine="columnar")
+    assert columnar_res == row_res
+    return row_res
+
+
+def test_columnar_map_sort_reduce(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons)
+    mapper = Map(split_name)(input_node)
+    sort_node = Sort(["id", "letter"])(mapper)
+    reducer = Reduce(count_letters, ["id", "letter"])(sort_node)
+    graph = Graph(input_node=input_node, output_node=reducer)
+
+    res = run_both_engines(graph)
+    assert res[0] == {"id": 1, "letter": "A", "count": 1}
+
+
+def test_columnar_fold(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons)
+    folder = Fold(sum_ages, {"age": 0})(input_node)
+    graph = Graph(input_node=input_node, output_node=folder)
+
+    assert graph.run(engine="columnar") == [{"age": 221}]
+
+
+@pytest.mark.parametrize("strategy", ["inner", "left", "right", "outer"])
+def test_columnar_join(strategy, get_advanced_persons, get_cities):
+    left_input = Input(input=copy.deepcopy(get_advanced_persons))
+    left_graph = Graph(input_node=left_input, output_node=left_input)
+
+    right_input = Input(input=get_cities)
+    join = Join(left_graph, 'id', strategy)(right_input)
+    graph = Graph(input_node=right_input, output_node=join)
+
+    row_res = graph.run()
+    left_graph.res = None
+    assert graph.run(engine="columnar") == row_res
+
+
+@pytest.mark.parametrize("engine", ["row", "batch", "columnar"])
+def test_join_extra_columns(engine):
+    left_input = Input(input=[{"id": 1, "a": 0}, {"id": 2, "a": 1, "x": 5}])
+    left_graph = Graph(input_node=left_input, output_node=left_input)
+
+    right_input = Input(input=[{"id": 2, "y": 1}, {"id": 1, "y": 2}])
+    join = Join(left_graph, 'id', "inner")(right_input)
+    graph = Graph(input_node=right_input, output_node=join)
+
+    assert graph.run(engine=engine) == [{"a": 0, "id": 1, "y": 2},
+                                        {"a": 1, "id": 2, "x": 5, "y": 1}]
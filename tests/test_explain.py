@@ -0,0 +1,64 @@
+import copy
+import io
+import pytest
+from Graph import Input, Map, Sort, Reduce, Join, Graph
+
+
+@pytest.fixture
+def get_rows():
+    return [{"id": i % 10, "value": i} for i in range(1000)]
+
+
+def duplicate(row):
+    row["value"] += 1
+    yield row
+    yield row
+
+
+def count_rows(rows):
+    yield {"id": rows[0]["id"], "count": len(rows)}
+
+
+def build_graph(rows):
+    names_input = Input(input=[{"id": i, "name": str(i)} for i in range(10)])
+    names = Graph(input_node=names_input, output_node=names_input,
+                  name="names")
+
+    input_node = Input(input=rows)
+    map_node = Map(duplicate)(input_node)
+    sort_node = Sort("id")(map_node)
+    reduce_node = Reduce(count_rows, "id")(sort_node)
+    join_node = Join(names, "id", "inner", method="hash")(reduce_node)
+    return Graph(input_node=input_node, output_node=join_node, name="main")
+
+
+def test_explain_estimates(get_rows):
+    rows = copy.deepcopy(get_rows)
+    graph = build_graph(rows)
+    file = io.StringIO()
+    graph.explain(file=file)
+    lines = file.getvalue().splitlines()
+
+    assert lines[0] == "Plan of names:"
+    assert lines[2] == "Plan of main:"
+    assert "    Map(operation=duplicate, ordered=True)  " \
+        "(rows=2000, cost=1000)" in lines
+    assert "    Reduce(operation=count_rows, key=['id'])  " \
+        "(rows=10, cost=2000)" in lines
+    assert any("Join(graph=names, key=['id'], strategy=inner, method=hash)"
+               in line for line in lines)
+    assert "actual" not in file.getvalue()
+    assert rows == get_rows
+
+
+def test_explain_analyze(get_rows):
+    graph = build_graph(get_rows)
+    file = io.StringIO()
+    graph.explain(analyze=True, file=file)
+    lines = file.getvalue().splitlines()
+
+    index = lines.index("    Map(operation=duplicate, ordered=True)  "
+                        "(rows=2000, cost=1000)")
+    assert lines[index + 1].startswith(
+        "        actual rows=2000, selectivity=2.000, self time=")
+    assert lines[-1].startswith("        actual rows=10, selectivity=0.500")
@@ -79,3 +79,47 @@ def test_city_fold():
         answer_name += name
 
     assert res == [{"id": -1, "name": answer_name}]
+
+
+def sum_folder(state, record):
+    return {'a': state['a'] + record['a']}
+
+
+def sum_combine(first_state, second_state):
+    return {'a': first_state['a'] + second_state['a']}
+
+
+def concat_folder(state, record):
+    return {'a': state['a'] + [record['a']]}
+
+
+def concat_combine(first_state, second_state):
+    return {'a': first_state['a'] + second_state['a']}
+
+
+def test_fold_twice():
+    input_node = Input(input=[{'a': i} for i in range(10)])
+    folder_node = Fold(sum_folder, {'a': 0})(input_node)
+    graph = Graph(input_node=input_node, output_node=folder_node)
+
+    assert graph.run() == [{'a': 45}]
+    assert graph.run() == [{'a': 45}]
+
+
+def test_parallel_fold():
+    input_node = Input(input=[{'a': i} for i in range(1000)])
+    folder_node = Fold(concat_folder, {'a': []}, combine=concat_combine,
+                       workers=3, chunk_size=70)(input_node)
+    graph = Graph(input_node=input_node, output_node=folder_node)
+
+    assert graph.run() == [{'a': list(range(1000))}]
+    assert graph.run() == [{'a': list(range(1000))}]
+
+
+def test_parallel_fold_empty():
+    input_node = Input(input=[])
+    folder_node = Fold(sum_folder, {'a': 0}, combine=sum_combine,
+                       workers=2)(input_node)
+    graph = Graph(input_node=input_node, output_node=folder_node)
+
+    assert graph.run() == [{'a': 0}]
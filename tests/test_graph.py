@@ -0,0 +1,132 @@
+import pytest
+from Graph import Input, Join, Graph, SpilledResult
+
+
+@pytest.fixture
+def get_persons():
+    return [
+        {"name": "Andrey", "id": 1},
+        {"name": "Leonid", "id": 2},
+        {"name": "Sergey", "id": 1},
+        {"name": "Grigoroy", "id": 4},
+        {"name": "Maxim", "id": 5},
+    ]
+
+
+def build_chain(rows, length):
+    """ :return: list of graphs, every graph reads result of previous. """
+    node = Input(input=rows)
+    graphs = [Graph(input_node=node, output_node=node, name="g0")]
+    for i in range(1, length):
+        node = Input(input=graphs[-1])
+        graphs.append(Graph(input_node=node, output_node=node,
+                            name="g{}".format(i)))
+    return graphs
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_dependency_chain(get_persons, workers):
+    graphs = build_chain(get_persons, 4)
+    assert graphs[3].order == graphs[:3]
+    assert graphs[3].run(workers=workers) == get_persons
+
+
+def test_concurrent_dependencies(get_persons):
+    first = Input(input=get_persons)
+    gr1 = Graph(input_node=first, output_node=first, name="first")
+
+    second = Input(input=get_persons)
+    gr2 = Graph(input_node=second, output_node=second, name="second")
+
+    third = Input(input=gr1)
+    gr3 = Graph(input_node=third, output_node=third, name="third")
+
+    fourth = Input(input=gr3)
+    join = Join(gr2, "id", "inner")(fourth)
+    gr4 = Graph(input_node=fourth, output_node=join, name="fourth")
+
+    expected = [{'id': 1, 'left_name': 'Andrey', 'right_name': 'Andrey'},
+                {'id': 1, 'left_name': 'Andrey', 'right_name': 'Sergey'},
+                {'id': 1, 'left_name': 'Sergey', 'right_name': 'Andrey'},
+                {'id': 1, 'left_name': 'Sergey', 'right_name': 'Sergey'},
+                {'id': 2, 'left_name': 'Leonid', 'right_name': 'Leonid'},
+                {'id': 4, 'left_name': 'Grigoroy', 'right_name': 'Grigoroy'},
+                {'id': 5, 'left_name': 'Maxim', 'right_name': 'Maxim'}]
+    assert gr4.run(workers=2) == expected
+    assert set(gr4.timings) == {gr1, gr2, gr3}
+    assert gr4.timings[gr1][1] <= gr4.timings[gr3][0]
+
+
+def test_release_dependencies(get_persons):
+    first = Input(input=get_persons)
+    gr1 = Graph(input_node=first, output_node=first, name="first")
+
+    second = Input(input=gr1)
+    gr2 = Graph(input_node=second, output_node=second, name="second")
+
+    third = Input(input=gr2)
+    join = Join(gr1, "id", "inner")(third)
+    gr3 = Graph(input_node=third, output_node=join, name="third")
+
+    expected = gr3.run()
+    assert gr1.res is not None and gr2.res is not None
+
+    gr1.res = gr2.res = None
+    assert gr3.run(release=True, pin=[gr2], verbose=True) == expected
+    assert gr1.res is None
+    assert gr2.res == get_persons
+    assert gr3.peak_retained_bytes > 0
+
+
+def test_spill_dependencies(tmp_path, get_persons):
+    first = Input(input=get_persons)
+    gr1 = Graph(input_node=first, output_node=first, name="first")
+
+    second = Input(input=get_persons)
+    join = Join(gr1, "id", "inner", method="hash")(second)
+    gr2 = Graph(input_node=second, output_node=join, name="second")
+    expected = gr2.run()
+
+    gr1.res = None
+    assert gr2.run(spill_dir=str(tmp_path)) == expected
+    assert isinstance(gr1.res, SpilledResult)
+    assert len(gr1.res) == 5
+    assert gr1.res[-1] == {"name": "Maxim", "id": 5}
+    assert list(gr1.res) == get_persons
+
+    gr1.res = None
+    gr2.run(spill_dir=str(tmp_path), release=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_release_dependency_chain(get_persons, workers):
+    graphs = build_chain(get_persons, 4)
+    assert graphs[3].run(workers=workers, release=True) == get_persons
+    assert all(graph.res is None for graph in graphs[:3])
+
+    g0, g1 = build_chain(get_persons, 2)
+    fourth = Input(input=g1)
+    g4 = Graph(input_node=fourth, output_node=fourth, name="g4")
+    fifth = Input(input=g4)
+    join = Join(g1, "id", "inner")(fifth)
+    g5 = Graph(input_node=fifth, output_node=join, name="g5")
+
+    assert g5.order[0] is g0
+    assert len(g5.run(workers=workers, release=True)) == 7
+    assert g0.res is None and g1.res is None and g4.res is None
+
+
+def test_spill_streams_rows(tmp_path, monkeypatch, get_persons):
+    written = []
+    write = SpilledResult.write.__func__
+
+    def spy(cls, path, rows):
+        written.append(isinstance(rows, list))
+        return write(cls, path, rows)
+
+    monkeypatch.setattr(SpilledResult, "write", classmethod(spy))
+    g0, g1 = build_chain(get_persons, 2)
+    assert g1.run(spill_dir=str(tmp_path)) == get_persons
+    assert written == [False]
+    assert isinstance(g0.res, SpilledResult)
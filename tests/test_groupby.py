@@ -0,0 +1,95 @@
+import pytest
+from Graph import Input, GroupBy, Graph, Count, Sum, Min, Max, Mean
+
+
+@pytest.fixture
+def get_docs_words():
+    return [
+        {"doc_id": 1, 'word': 'a'},
+        {"doc_id": 2, 'word': 'a'},
+        {"doc_id": 1, 'word': 'b'},
+        {"doc_id": 1, 'word': 'c'},
+        {"doc_id": 2, 'word': 'a'},
+        {"doc_id": 1, 'word': 'a'},
+        {"doc_id": 2, 'word': 'a'},
+        {"doc_id": 2, 'word': 'd'},
+        {"doc_id": 3, 'word': 'x'},
+        {"doc_id": 3, 'word': 'y'},
+        {"doc_id": 3, 'word': 'y'},
+    ]
+
+
+@pytest.fixture
+def get_advanced_number():
+    return [
+        {"id": 1, "word": "a", "value": 1},
+        {"id": 2, "word": "b", "value": 3},
+        {"id": 1, "word": "b", "value": 2},
+        {"id": 2, "word": "b", "value": 4},
+        {"id": 4, "word": "d", "value": 1},
+        {"id": 2, "word": "b", "value": 5},
+        {"id": 4, "word": "d", "value": 4},
+    ]
+
+
+def word_counter(rows):
+    yield {'word': rows[0]['word'], 'number': len(rows)}
+
+
+def test_groupby_reducer(get_docs_words):
+    input_node = Input(input=get_docs_words)
+    groupby_node = GroupBy(word_counter, "word")(input_node)
+    graph = Graph(input_node=input_node, output_node=groupby_node)
+
+    assert graph.run() == [
+        {'word': 'a', 'number': 5},
+        {'word': 'b', 'number': 1},
+        {'word': 'c', 'number': 1},
+        {'word': 'd', 'number': 1},
+        {'word': 'x', 'number': 1},
+        {'word': 'y', 'number': 2},
+    ]
+
+
+def test_groupby_aggregations(get_advanced_number):
+    input_node = Input(input=get_advanced_number)
+    groupby_node = GroupBy(key=["id", "word"], aggregations={
+        "count": Count(),
+        "sum": Sum("value"),
+        "min": Min("value"),
+        "max": Max("value"),
+        "mean": Mean("value"),
+    })(input_node)
+    graph = Graph(input_node=input_node, output_node=groupby_node)
+
+    assert graph.run() == [
+        {'id': 1, 'word': 'a', 'count': 1, 'sum': 1, 'min': 1, 'max': 1,
+         'mean': 1.0},
+        {'id': 2, 'word': 'b', 'count': 3, 'sum': 12, 'min': 3, 'max': 5,
+         'mean': 4.0},
+        {'id': 1, 'word': 'b', 'count': 1, 'sum': 2, 'min': 2, 'max': 2,
+         'mean': 2.0},
+        {'id': 4, 'word': 'd', 'count': 2, 'sum': 5, 'min': 1, 'max': 4,
+         'mean': 2.5},
+    ]
+
+
+@pytest.mark.parametrize("aggregate", [True, False])
+def test_groupby_spill(aggregate):
+    rows = [{"a": i % 13, "b": i} for i in range(3000)]
+    input_node = Input(input=rows)
+    if aggregate:
+        groupby_node = GroupBy(key="a", aggregations={"sum": Sum("b")},
+                               memory_limit=500, partitions=4)(input_node)
+    else:
+        groupby_node = GroupBy(sum_reducer, "a", memory_limit=5000,
+                               partitions=4)(input_node)
+    graph = Graph(input_node=input_node, output_node=groupby_node)
+
+    res = sorted(graph.run(), key=lambda row: row["a"])
+    assert res == [{"a": a, "sum": sum(range(a, 3000, 13))}
+                   for a in range(13)]
+
+
+def sum_reducer(rows):
+    yield {"a": rows[0]["a"], "sum": sum(row["b"] for row in rows)}
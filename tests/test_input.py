@@ -1,3 +1,7 @@
+import bz2
+import gzip
+import json
+import lzma
 import pytest
 from Graph import Input, Graph
 
@@ -69,3 +73,88 @@ def test_order_computation():
     third = Input(input=gr2)
     gr3 = Graph(input_node=third, output_node=third, name="third")
     assert gr3.order == [gr1, gr2]
+
+
+def write_json_lines(path, rows, opener=open):
+    with opener(path, "wt") as file:
+        for row in rows:
+            file.write(json.dumps(row) + "\n")
+
+
+def test_input_file_run(tmp_path, get_persons):
+    path = str(tmp_path / "persons.txt")
+    write_json_lines(path, get_persons)
+
+    input_node = Input(input_file=path)
+    assert list(input_node.run()) == get_persons
+
+
+@pytest.mark.parametrize("extension, opener", [
+    (".gz", gzip.open),
+    (".bz2", bz2.open),
+    (".xz", lzma.open),
+])
+def test_input_compressed_file_run(tmp_path, get_persons, extension, opener):
+    path = str(tmp_path / ("persons.txt" + extension))
+    write_json_lines(path, get_persons, opener)
+
+    input_node = Input(input_file=path)
+    assert list(input_node.run()) == get_persons
+
+
+def test_input_file_batch_run(tmp_path, get_persons):
+    path = str(tmp_path / "persons.txt")
+    write_json_lines(path, get_persons)
+
+    input_node = Input(input_file=path, batch_size=2)
+    assert list(input_node.run()) == get_persons
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_input_file_parallel_run(tmp_path, ordered):
+    rows = [{"id": i, "name": "person{}".format(i)} for i in range(2000)]
+    path = str(tmp_path / "persons.txt")
+    write_json_lines(path, rows)
+
+    input_node = Input(input_file=path, workers=2, ordered=ordered,
+                       range_size=1000)
+    res = list(input_node.run())
+    if ordered:
+        assert res == rows
+    else:
+        assert sorted(res, key=lambda row: row["id"]) == rows
+
+
+def test_input_file_start_line(tmp_path, get_persons):
+    path = str(tmp_path / "persons.txt")
+    write_json_lines(path, get_persons)
+
+    assert list(Input(input_file=path, start_line=2).run()) == get_persons[2:]
+    assert list(Input(input_file=path, start_line=3, workers=2).run()) == \
+        get_persons[3:]
+    assert list(Input(input_file=path, start_line=10).run()) == []
+
+    write_json_lines(path, get_persons[1:])
+    assert list(Input(input_file=path, start_line=1).run()) == \
+        get_persons[2:]
+
+
+def test_input_file_sample(tmp_path):
+    rows = [{"id": i} for i in range(100)]
+    path = str(tmp_path / "rows.txt")
+    write_json_lines(path, rows)
+
+    sample = list(Input(input_file=path, sample=10, seed=1).run())
+    assert len(sample) == 10
+    assert sample == sorted(sample, key=lambda row: row["id"])
+    assert all(row in rows for row in sample)
+    assert sample == list(Input(input_file=path, sample=10, seed=1).run())
+    assert len(list(Input(input_file=path, sample=1000).run())) == 100
+
+
+def test_input_compressed_file_can_not_be_split(tmp_path, get_persons):
+    path = str(tmp_path / "persons.txt.gz")
+    write_json_lines(path, get_persons, gzip.open)
+
+    with pytest.raises(ValueError):
+        list(Input(input_file=path, workers=2).run())
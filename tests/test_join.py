@@ -1,3 +1,5 @@
+import copy
+import json
 import pytest
 from Graph import Input, Join, Graph
 
@@ -262,4 +264,135 @@ def test_outer_without_key():
         print(value)
 
     print()
-    print("******************")
\ No newline at end of file
+    print("******************")
+
+
+def run_join(left_rows, right_rows, key, strategy, method):
+    left_input = Input(input=copy.deepcopy(left_rows))
+    left_graph = Graph(input_node=left_input, output_node=left_input)
+
+    right_input = Input(input=copy.deepcopy(right_rows))
+    join = Join(left_graph, key, strategy, method=method)(right_input)
+
+    graph = Graph(input_node=right_input, output_node=join)
+    return graph.run()
+
+
+def canonical(rows):
+    return sorted(rows, key=lambda row: json.dumps(row, sort_keys=True))
+
+
+@pytest.mark.parametrize("strategy", ["inner", "left", "right", "outer"])
+def test_hash_join(strategy, get_advanced_persons, get_cities):
+    # Left table is bigger, so hash table is built on the right one.
+    expected = run_join(get_advanced_persons, get_cities,
+                        'id', strategy, "sort")
+    res = run_join(get_advanced_persons, get_cities, 'id', strategy, "hash")
+    assert canonical(res) == canonical(expected)
+
+    # Right table is bigger, so hash table is built on the left one.
+    expected = run_join(get_cities, get_advanced_persons,
+                        'id', strategy, "sort")
+    res = run_join(get_cities, get_advanced_persons, 'id', strategy, "hash")
+    assert canonical(res) == canonical(expected)
+
+
+@pytest.mark.parametrize("strategy", ["inner", "left", "right", "outer"])
+def test_merge_join(strategy, get_advanced_persons, get_advanced_cities):
+    persons = sorted(get_advanced_persons, key=lambda row: row['id'])
+
+    expected = run_join(persons, get_advanced_cities, 'id', strategy, "sort")
+    res = run_join(persons, get_advanced_cities, 'id', strategy, "merge")
+    assert res == expected
+
+
+def test_merge_join_unsorted(get_advanced_persons, get_advanced_cities):
+    with pytest.raises(RuntimeError):
+        run_join(get_advanced_persons, get_advanced_cities,
+                 'id', "inner", "merge")
+
+
+@pytest.mark.parametrize("method", ["sort", "hash", "merge"])
+def test_join_does_not_modify_input(method, get_advanced_persons, get_cities):
+    persons = sorted(get_advanced_persons, key=lambda row: row['id'])
+    left_input = Input(input=persons)
+    left_graph = Graph(input_node=left_input, output_node=left_input)
+    left_graph.res = left_graph.run()
+
+    first_input = Input(input=get_cities)
+    first_join = Join(left_graph, 'id', "inner", method=method)(first_input)
+    first_graph = Graph(input_node=first_input, output_node=first_join)
+
+    second_input = Input(input=get_cities)
+    second_join = Join(left_graph, 'id', "left", method=method)(second_input)
+    second_graph = Graph(input_node=second_input, output_node=second_join)
+
+    first_res = first_graph.run()
+    second_res = second_graph.run()
+
+    assert left_graph.res == persons
+    assert first_res == first_graph.run()
+    assert len(first_res) == 7
+    assert len(second_res) == 9
+    assert all("left_name" in row for row in second_res)
+
+
+def test_many_to_many_join():
+    left = [{"id": 1, "a": 1}, {"id": 1, "a": 2}]
+    right = [{"id": 1, "b": 1}, {"id": 1, "b": 2}]
+
+    res = run_join(left, right, 'id', "inner", "sort")
+    assert res == [
+        {'a': 1, 'b': 1, 'id': 1},
+        {'a': 1, 'b': 2, 'id': 1},
+        {'a': 2, 'b': 1, 'id': 1},
+        {'a': 2, 'b': 2, 'id': 1},
+    ]
+
+
+def test_merge_join_is_lazy():
+    left_input = Input(input=[{"id": i, "a": i} for i in range(10)])
+    left_graph = Graph(input_node=left_input, output_node=left_input)
+    left_graph.res = left_graph.run()
+
+    read = []
+
+    def right_rows():
+        for i in range(10):
+            read.append(i)
+            yield {"id": i, "b": i}
+
+    join = Join(left_graph, 'id', "inner", method="merge")
+    assert next(join._join(right_rows())) == {'a': 0, 'b': 0, 'id': 0}
+    assert len(read) == 2
+
+
+@pytest.mark.parametrize("method", ["sort", "hash", "merge"])
+def test_join_rows_without_columns(method):
+    left = [{"id": 1, "a": 1}, {"id": 2}]
+    right = [{"id": 1, "b": 1}, {"id": 2, "b": 2}]
+
+    res = run_join(left, right, 'id', "inner", method)
+    assert canonical(res) == [
+        {'a': 1, 'b': 1, 'id': 1},
+        {'b': 2, 'id': 2},
+    ]
+
+    res = run_join(left, [{"id": 3}], 'id', "outer", method)
+    assert canonical(res) == [
+        {'a': 1, 'id': 1},
+        {'a': None, 'id': 3},
+        {'id': 2},
+    ]
+
+
+@pytest.mark.parametrize("method", ["sort", "hash", "merge"])
+def test_join_rows_with_extra_columns(method):
+    left = [{"id": 1, "a": 0}, {"id": 2, "a": 1, "x": 5, "y": 0}]
+    right = [{"id": 1, "y": 2}, {"id": 2, "y": 1}]
+
+    res = run_join(left, right, 'id', "outer", method)
+    assert canonical(res) == [
+        {'a': 0, 'id': 1, 'y': 2},
+        {'a': 1, 'id': 2, 'left_y': 0, 'right_y': 1, 'x': 5},
+    ]
@@ -87,3 +87,28 @@ def test_square_mapper():
 
     answer = [{'a': i**2} for i in range(1, 6)]
     assert res == answer
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_mapper(ordered):
+    rows = [{'a': i} for i in range(100)]
+    input_node = Input(input=rows)
+    mapper_node = Map(square_mapper, workers=2, chunk_size=7,
+                      ordered=ordered)(input_node)
+    graph = Graph(input_node=input_node, output_node=mapper_node)
+    res = graph.run()
+
+    answer = [{'a': i**2} for i in range(100)]
+    if ordered:
+        assert res == answer
+    else:
+        assert sorted(res, key=lambda row: row['a']) == answer
+
+
+def test_parallel_mapper_not_picklable():
+    input_node = Input(input=[{'a': 1}])
+    mapper_node = Map(lambda row: [row], workers=2)(input_node)
+    graph = Graph(input_node=input_node, output_node=mapper_node)
+
+    with pytest.raises(ValueError, match="can not be pickled"):
+        graph.run()
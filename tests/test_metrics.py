@@ -0,0 +1,104 @@
+import pytest
+import tracemalloc
+from Graph import Input, Map, Sort, Reduce, Fold, Join, Tee, Graph
+
+
+@pytest.fixture
+def get_rows():
+    return [{"id": i % 10, "value": i} for i in range(1000)]
+
+
+def keep_even(row):
+    if row["value"] % 2 == 0:
+        yield row
+
+
+def count_rows(rows):
+    yield {"id": rows[0]["id"], "count": len(rows)}
+
+
+@pytest.mark.parametrize("engine", ["row", "batch"])
+def test_node_metrics(get_rows, engine):
+    input_node = Input(input=get_rows)
+    map_node = Map(keep_even)(input_node)
+    sort_node = Sort("id")(map_node)
+    reduce_node = Reduce(count_rows, "id")(sort_node)
+    graph = Graph(input_node=input_node, output_node=reduce_node,
+                  name="counter")
+
+    res = graph.run(engine=engine, profile=True)
+    assert res == graph.run()
+
+    report = graph.report()
+    assert [row["node"].split("(")[0] for row in report] == \
+        ["Input", "Map", "Sort", "Reduce"]
+    assert [(row["rows_in"], row["rows_out"]) for row in report] == \
+        [(1000, 1000), (1000, 500), (500, 500), (500, 5)]
+    assert all(row["graph"] == "counter" for row in report)
+
+    sort_metrics = graph.metrics[sort_node]
+    assert sort_metrics.wait_time == graph.metrics[map_node].total_time
+    assert sort_metrics.self_time == pytest.approx(
+        sort_metrics.total_time - sort_metrics.wait_time)
+    assert sort_metrics.peak_memory > 0
+    assert "run" not in sort_node.__dict__
+
+
+def test_dependency_metrics(get_rows):
+    right_input = Input(input=[{"id": 1, "name": "one"}])
+    right_graph = Graph(input_node=right_input, output_node=right_input,
+                        name="names")
+
+    input_node = Input(input=get_rows)
+    join_node = Join(right_graph, "id", "inner")(input_node)
+    graph = Graph(input_node=input_node, output_node=join_node, name="joined")
+    graph.run(profile=True)
+
+    report = graph.report()
+    assert [row["graph"] for row in report] == ["names", "joined", "joined"]
+    assert report[-1]["rows_in"] == 1001
+    assert report[-1]["rows_out"] == 100
+
+
+def test_profile_failure_restores_nodes(get_rows):
+    def fail(row):
+        yield row["missing"]
+
+    input_node = Input(input=get_rows)
+    map_node = Map(fail)(input_node)
+    graph = Graph(input_node=input_node, output_node=map_node)
+
+    with pytest.raises(KeyError):
+        graph.run(profile=True)
+    assert "run" not in map_node.__dict__
+    assert not tracemalloc.is_tracing()
+
+
+def count_state(state, row):
+    state["count"] += 1
+    return state
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_shared_tee_metrics(get_rows, workers):
+    input_node = Input(input=get_rows)
+    tee = Tee(buffer_size=10)(input_node)
+    even = Map(keep_even)(tee.branch())
+    even_graph = Graph(input_node=input_node, output_node=even, name="even")
+    count = Fold(count_state, {"count": 0})(tee.branch())
+    count_graph = Graph(input_node=input_node, output_node=count,
+                        name="count")
+
+    joined = Input(even_graph)
+    graph = Graph(input_node=joined,
+                  output_node=Join(count_graph, [], "outer")(joined))
+    graph.run(workers=workers, profile=True)
+
+    report = graph.report()
+    for name in ("even", "count"):
+        rows = {row["node"].split("(")[0]: row["rows_out"]
+                for row in report if row["graph"] == name}
+        assert rows["Input"] == rows["Tee"] == 1000
+    assert all("run" not in node.__dict__
+               for node in even_graph.nodes + count_graph.nodes)
+    assert not tracemalloc.is_tracing()
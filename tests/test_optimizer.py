@@ -0,0 +1,92 @@
+import io
+import pytest
+from Graph import Input, Map, Sort, Filter, Project, Join, Graph
+
+
+@pytest.fixture
+def get_persons():
+    return [
+        {"name": "Andrey", "id": 1, "age": 38},
+        {"name": "Leonid", "id": 2, "age": 20},
+        {"name": "Sergey", "id": 3, "age": 25},
+        {"name": "Grigoroy", "id": 4, "age": 64},
+        {"name": "Misha", "id": 5, "age": 5},
+    ]
+
+
+def add_one(row):
+    yield {"id": row["id"], "age": row["age"] + 1, "name": row["name"]}
+
+
+def duplicate(row):
+    yield row
+    yield row
+
+
+def build_graph(rows, optimize):
+    input_node = Input(input=rows)
+    map_node = Map(add_one)(input_node)
+    second_map_node = Map(duplicate)(map_node)
+    sort_node = Sort("age")(second_map_node)
+    project_node = Project(["age", "name"])(sort_node)
+    filter_node = Filter(lambda row: row["age"] > 20,
+                         columns="age")(project_node)
+    return Graph(input_node=input_node, output_node=filter_node,
+                 optimize=optimize)
+
+
+def test_optimized_plan_result(get_persons):
+    expected = build_graph(get_persons, optimize=False).run()
+    graph = build_graph(get_persons, optimize=True)
+
+    assert graph.run() == expected
+    assert [type(node).__name__ for node in graph.plan] == \
+        ["Input", "Map", "Filter", "Project", "Sort"]
+    assert [type(node).__name__ for node in graph.nodes] == \
+        ["Input", "Map", "Map", "Sort", "Project", "Filter"]
+
+
+def test_elided_sort_is_removed(get_persons):
+    input_node = Input(input=get_persons, sorted_by="id")
+    sort_node = Sort("id")(input_node)
+    graph = Graph(input_node=input_node, output_node=sort_node,
+                  optimize=True)
+
+    assert graph.plan == [input_node]
+    assert graph.run() == get_persons
+
+
+def test_filter_pushed_below_join(get_persons):
+    ages = [{"id": 1, "group": "a"}, {"id": 3, "group": "b"},
+            {"id": 4, "group": "c"}]
+    right_input = Input(input=ages)
+    right_graph = Graph(input_node=right_input, output_node=right_input)
+
+    def build(optimize, strategy):
+        input_node = Input(input=get_persons)
+        join_node = Join(right_graph, "id", strategy)(input_node)
+        filter_node = Filter(lambda row: row["id"] % 2 == 1,
+                             columns=["id"])(join_node)
+        return Graph(input_node=input_node, output_node=filter_node,
+                     optimize=optimize)
+
+    graph = build(True, "inner")
+    assert [type(node).__name__ for node in graph.plan] == \
+        ["Input", "Filter", "Join"]
+    assert graph.run() == build(False, "inner").run()
+
+    graph = build(True, "left")
+    assert [type(node).__name__ for node in graph.plan] == \
+        ["Input", "Join", "Filter"]
+
+
+def test_explain(get_persons):
+    graph = build_graph(get_persons, optimize=True)
+    graph.name = "persons"
+    file = io.StringIO()
+    graph.explain(file=file)
+    text = file.getvalue()
+
+    assert "Plan of persons:" in text
+    assert "Optimized plan of persons:" in text
+    assert "Map(operation=add_one + duplicate, ordered=True)" in text
@@ -0,0 +1,70 @@
+import gzip
+import io
+import json
+import pytest
+from Graph import Input, Map, Graph, ResultCache
+
+
+@pytest.fixture
+def get_rows():
+    return [{"word": "w{}".format(i % 13), "count": i} for i in range(1000)]
+
+
+def build_graph(rows):
+    input_node = Input(input=rows)
+    return Graph(input_node=input_node, output_node=input_node)
+
+
+def read_lines(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_output_file_object(get_rows):
+    output_file = io.StringIO()
+    assert build_graph(get_rows).run(output_file=output_file,
+                                     output_buffer_size=100) is None
+    assert read_lines(output_file.getvalue()) == get_rows
+
+
+def test_output_gzip_path(tmp_path, get_rows):
+    path = str(tmp_path / "result.txt.gz")
+    build_graph(get_rows).run(output_file=path)
+
+    with gzip.open(path, "rt") as file:
+        assert read_lines(file.read()) == get_rows
+
+
+def test_output_shards(tmp_path, get_rows):
+    path = str(tmp_path / "result-{}.txt")
+    build_graph(get_rows).run(output_file=path, shards=4, shard_by="word")
+
+    rows = []
+    for shard in range(4):
+        with open(path.format(shard)) as file:
+            shard_rows = read_lines(file.read())
+        words = set(row["word"] for row in shard_rows)
+        for other in range(shard):
+            with open(path.format(other)) as file:
+                assert words.isdisjoint(row["word"]
+                                        for row in read_lines(file.read()))
+        rows.extend(shard_rows)
+
+    assert sorted(rows, key=lambda row: row["count"]) == get_rows
+
+
+def test_output_shards_requires_placeholder(tmp_path, get_rows):
+    with pytest.raises(ValueError):
+        build_graph(get_rows).run(output_file=str(tmp_path / "result.txt"),
+                                  shards=2, shard_by="word")
+
+
+def test_output_with_cache(tmp_path, get_rows):
+    cache = ResultCache(str(tmp_path / "cache"))
+    input_node = Input(input=get_rows)
+    graph = Graph(input_node=input_node,
+                  output_node=Map(lambda row: [row])(input_node))
+
+    for _ in range(2):
+        output_file = io.StringIO()
+        graph.run(output_file=output_file, cache=cache)
+        assert read_lines(output_file.getvalue()) == get_rows
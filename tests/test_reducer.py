@@ -1,5 +1,5 @@
 import pytest
-from Graph import Input, Reduce, Graph
+from Graph import Input, Reduce, Sort, Graph
 
 from collections import Counter
 
@@ -156,3 +156,32 @@ def test_sum_reducer():
         {'id': 4, 'word': 'd', 'sum': 5},
         {'id': 5, 'word': 'd', 'sum': -4},
     ]
+
+
+def test_parallel_word_reducer(get_docs_words):
+    input_node = Input(input=get_docs_words[::-1])
+    sort_node = Sort("doc_id")(input_node)
+    reducer_node = Reduce(word_reducer, "doc_id", workers=2)(sort_node)
+    graph = Graph(input_node=input_node, output_node=reducer_node)
+    res = graph.run()
+
+    reducer_node.workers = None
+    assert res == graph.run()
+
+
+def test_parallel_sum_reducer(get_advanced_number):
+    input_node = Input(input=get_advanced_number)
+    reducer_node = Reduce(sum_reducer, ["id", "word"],
+                          workers=3)(input_node)
+    graph = Graph(input_node=input_node, output_node=reducer_node)
+
+    res = graph.run()
+    assert res == [
+        {'id': 1, 'word': 'a', 'sum': 1},
+        {'id': 1, 'word': 'b', 'sum': 2},
+        {'id': 2, 'word': 'b', 'sum': 12},
+        {'id': 3, 'word': 'c', 'sum': 6},
+        {'id': 4, 'word': 'c', 'sum': 7},
+        {'id': 4, 'word': 'd', 'sum': 5},
+        {'id': 5, 'word': 'd', 'sum': -4},
+    ]
@@ -1,5 +1,5 @@
 import pytest
-from Graph import Input, Sort, Graph
+from Graph import Input, Sort, Reduce, Graph
 
 
 @pytest.fixture
@@ -137,3 +137,75 @@ def test_persons_sort_name_age():
     ]
 
 
+def test_external_sort(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons)
+    sort_node = Sort(by='id', memory_limit=1)(input_node)
+    graph = Graph(input_node=input_node, output_node=sort_node)
+    res = graph.run()
+
+    assert res == sorted(get_advanced_persons, key=lambda row: row['id'])
+
+
+def test_external_sort_many_runs():
+    rows = [{"a": i % 7, "b": i} for i in range(5000)]
+    input_node = Input(input=rows)
+    sort_node = Sort(by='a', memory_limit=10000)(input_node)
+    graph = Graph(input_node=input_node, output_node=sort_node)
+    res = graph.run()
+
+    assert res == sorted(rows, key=lambda row: row['a'])
+
+
+def test_external_sort_more_runs_than_open_files():
+    resource = pytest.importorskip("resource")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+
+    # Every row is a sorted run.
+    rows = [{"a": i % 13, "b": i} for i in range(3000)]
+    input_node = Input(input=rows)
+    sort_node = Sort(by='a', memory_limit=1)(input_node)
+    graph = Graph(input_node=input_node, output_node=sort_node)
+
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, hard), hard))
+    try:
+        res = graph.run()
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert res == sorted(rows, key=lambda row: row['a'])
+
+
+def test_declared_sorted_input(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons, sorted_by="name")
+    sort_node = Sort(by='name')(input_node)
+    graph = Graph(input_node=input_node, output_node=sort_node)
+
+    assert sort_node.elided
+    assert graph.run() == get_advanced_persons
+
+
+def first_person(rows):
+    yield rows[0]
+
+
+def test_sort_after_sort_and_reduce(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons)
+    first_sort = Sort(by=['id', 'age'])(input_node)
+    second_sort = Sort(by='id')(first_sort)
+    reducer = Reduce(first_person, 'id')(second_sort)
+    third_sort = Sort(by='id')(reducer)
+    fourth_sort = Sort(by='name')(third_sort)
+    graph = Graph(input_node=input_node, output_node=fourth_sort)
+
+    assert not first_sort.elided
+    assert second_sort.elided
+    assert reducer.ordering == ['id']
+    assert third_sort.elided
+    assert not fourth_sort.elided
+    assert graph.run() == [
+        {'name': 'Grigoroy', 'id': 4, 'age': 64},
+        {'name': 'Maxim', 'id': 5, 'age': 28},
+        {'name': 'Misha', 'id': 1, 'age': 5},
+        {'name': 'Rishat', 'id': 2, 'age': 17},
+        {'name': 'Stepan', 'id': 10, 'age': 14},
+    ]
@@ -0,0 +1,77 @@
+import pytest
+from Graph import Input, Map, Fold, Join, Tee, Graph
+
+
+@pytest.fixture
+def get_rows():
+    return [{"id": i, "value": i % 7} for i in range(5000)]
+
+
+def double(row):
+    yield {"id": row["id"], "value": 2 * row["value"]}
+
+
+def add_value(state, row):
+    state["value"] += row["value"]
+    return state
+
+
+def build_graphs(rows, buffer_size, calls):
+    def count_call(row):
+        calls.append(row["id"])
+        yield row
+
+    input_node = Input(input=rows)
+    tee = Tee(buffer_size=buffer_size)(Map(count_call)(input_node))
+    double_graph = Graph(input_node=input_node,
+                         output_node=Map(double)(tee.branch()))
+    sum_graph = Graph(input_node=input_node,
+                      output_node=Fold(add_value, {"value": 0})(tee.branch()))
+    return double_graph, sum_graph
+
+
+@pytest.mark.parametrize("buffer_size", [0, 100, 100000])
+def test_branches_read_one_pass(get_rows, buffer_size):
+    calls = []
+    double_graph, sum_graph = build_graphs(get_rows, buffer_size, calls)
+
+    double_res = double_graph.run()
+    sum_res = sum_graph.run()
+
+    assert double_res == [{"id": row["id"], "value": 2 * row["value"]}
+                          for row in get_rows]
+    assert sum_res == [{"value": sum(row["value"] for row in get_rows)}]
+    assert len(calls) == len(get_rows)
+
+    double_graph.run()
+    assert len(calls) == 2 * len(get_rows)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_dependencies_share_tee(get_rows, workers):
+    calls = []
+    double_graph, sum_graph = build_graphs(get_rows, 100, calls)
+
+    input_node = Input(double_graph)
+    join_node = Join(sum_graph, [], "outer")(input_node)
+    graph = Graph(input_node=input_node, output_node=join_node)
+
+    res = graph.run(workers=workers)
+    assert len(res) == len(get_rows)
+    assert len(calls) == len(get_rows)
+
+
+def test_optimizer_keeps_shared_nodes(get_rows):
+    input_node = Input(input=get_rows)
+    tee = Tee()(input_node)
+    first = Map(double)(Map(double)(tee.branch()))
+    second = tee.branch()
+    first_graph = Graph(input_node=input_node, output_node=first,
+                        optimize=True)
+    second_graph = Graph(input_node=input_node, output_node=second,
+                         optimize=True)
+
+    assert first_graph.plan[:3] == first_graph.nodes[:3]
+    assert len(first_graph.plan) == 4
+    assert first_graph.run()[1] == {"id": 1, "value": 4}
+    assert second_graph.run() == get_rows
@@ -0,0 +1,53 @@
+import pytest
+from Graph import Input, TopK, Graph
+
+
+@pytest.fixture
+def get_advanced_persons():
+    return [
+        {"name": "Andrey", "id": 1, "age": 38},
+        {"name": "Leonid", "id": 2, "age": 20},
+        {"name": "Sergey", "id": 1, "age": 25},
+        {"name": "Grigoroy", "id": 4, "age": 64},
+        {"name": "Misha", "id": 1, "age": 5},
+        {"name": "Roma", "id": 1, "age": 25},
+        {"name": "Rishat", "id": 2, "age": 17},
+        {"name": "Maxim", "id": 5, "age": 28},
+        {"name": "Stepan", "id": 10, "age": 14},
+    ]
+
+
+def test_global_top(get_advanced_persons):
+    input_node = Input(input=get_advanced_persons)
+    top_node = TopK(3, "age", reverse=True)(input_node)
+    graph = Graph(input_node=input_node, output_node=top_node)
+
+    assert graph.run() == sorted(get_advanced_persons,
+                                 key=lambda row: row["age"],
+                                 reverse=True)[:3]
+
+
+@pytest.mark.parametrize("reverse", [True, False])
+def test_top_per_group(get_advanced_persons, reverse):
+    input_node = Input(input=get_advanced_persons)
+    top_node = TopK(2, ["age", "name"], key="id",
+                    reverse=reverse)(input_node)
+    graph = Graph(input_node=input_node, output_node=top_node)
+
+    expected = []
+    for group_id in [1, 2, 4, 5, 10]:
+        rows = [row for row in get_advanced_persons if row["id"] == group_id]
+        rows.sort(key=lambda row: (row["age"], row["name"]), reverse=reverse)
+        expected.extend(rows[:2])
+
+    assert graph.run() == expected
+
+
+def test_top_stable_ties():
+    rows = [{"id": i, "value": i % 2} for i in range(10)]
+    input_node = Input(input=rows)
+    top_node = TopK(3, "value", reverse=True)(input_node)
+    graph = Graph(input_node=input_node, output_node=top_node)
+
+    assert graph.run() == [{"id": 1, "value": 1}, {"id": 3, "value": 1},
+                           {"id": 5, "value": 1}]